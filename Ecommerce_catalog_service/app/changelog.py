@@ -0,0 +1,117 @@
+"""
+Product change feed.
+
+Every product write appends one `products_changelog` row per product, in the
+same transaction, stamped with a version from the single-row
+`product_version_seq` counter. The counter is bumped with
+`LAST_INSERT_ID(version + n)` so the new value comes back in the UPDATE's OK
+packet, and its row lock is held until commit: transactions therefore commit
+in version order, and a consumer reading `version > since` never skips a
+lower version that becomes visible later. Call `record()` as the last write
+of the transaction to keep that lock short.
+
+Like `search`, the write side has no DB/pool imports so `csv_loader.py` can
+put its chunks on the feed too, through `record_blocking()`.
+"""
+
+DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS product_version_seq (
+        id TINYINT PRIMARY KEY,
+        version BIGINT NOT NULL
+    );
+    """,
+    "INSERT IGNORE INTO product_version_seq (id, version) VALUES (1, 0);",
+    """
+    CREATE TABLE IF NOT EXISTS products_changelog (
+        version BIGINT PRIMARY KEY,
+        op VARCHAR(8) NOT NULL,
+        product_id INT NOT NULL,
+        sku VARCHAR(64) NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        category VARCHAR(100),
+        price DECIMAL(10,2),
+        is_active BOOLEAN NOT NULL,
+        changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+        INDEX idx_products_changelog_product (product_id, version)
+    );
+    """,
+)
+
+COLUMNS = ("version", "op", "product_id", "sku", "name", "category", "price", "is_active", "changed_at")
+
+
+BUMP_SQL = "UPDATE product_version_seq SET version = LAST_INSERT_ID(version + %s) WHERE id = 1"
+
+INSERT_SQL = (
+    "INSERT INTO products_changelog (version, op, product_id, sku, name, category, price, is_active)"
+    " VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def _entries(last, changes):
+    first = last - len(changes) + 1
+    return [
+        (first + i, op, row["product_id"], row["sku"], row["name"], row["category"], row["price"],
+         bool(row["is_active"]))
+        for i, (op, row) in enumerate(changes)
+    ]
+
+
+async def record(cursor, changes):
+    """Append `(op, row)` changes; call last inside the transaction that made them.
+
+    `row` holds the product's state after the change (product_id, sku, name,
+    category, price, is_active). Returns the highest version assigned.
+    """
+    if not changes:
+        return None
+    await cursor.execute(BUMP_SQL, (len(changes),))
+    last = cursor.lastrowid
+    await cursor.executemany(INSERT_SQL, _entries(last, changes))
+    return last
+
+
+def record_blocking(cursor, changes):
+    """`record()` for a blocking mysql.connector cursor (used by the loader)."""
+    if not changes:
+        return None
+    cursor.execute(BUMP_SQL, (len(changes),))
+    last = cursor.lastrowid
+    cursor.executemany(INSERT_SQL, _entries(last, changes))
+    return last
+
+
+async def current_version():
+    """Latest committed version; a replica bootstrapped now resumes the feed from here."""
+    from .db import get_connection
+
+    async with get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("SELECT version FROM product_version_seq WHERE id = 1")
+            row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def fetch_changes(since, limit):
+    """Return `(changes, next_since, has_more)` for versions after `since`."""
+    from .db import get_connection
+
+    async with get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM products_changelog"
+                " WHERE version > %s ORDER BY version LIMIT %s",
+                (since, limit + 1)
+            )
+            rows = await cursor.fetchall()
+
+    has_more = len(rows) > limit
+    changes = []
+    for row in rows[:limit]:
+        change = dict(zip(COLUMNS, row))
+        change["price"] = float(change["price"]) if change["price"] is not None else None
+        change["is_active"] = bool(change["is_active"])
+        changes.append(change)
+    next_since = changes[-1]["version"] if changes else since
+    return changes, next_since, has_more
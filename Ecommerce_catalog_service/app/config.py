@@ -7,6 +7,24 @@ class Settings(BaseSettings):
     MYSQL_PASSWORD: str
     MYSQL_DB: str = "ecommerce"
     MYSQL_PORT: Optional[int] = 3306
+    MYSQL_POOL_MIN_SIZE: int = 5
+    MYSQL_POOL_MAX_SIZE: int = 50
+    MYSQL_POOL_RECYCLE_SECONDS: int = 3600
+    PRODUCT_CACHE_MAX_ENTRIES: int = 1024
+    PRODUCT_CACHE_TTL_SECONDS: float = 30.0
+    PRODUCT_BULK_MAX_ITEMS: int = 1000
+    PRODUCT_LOOKUP_MAX_KEYS: int = 500
+    OUTBOX_DISPATCHER_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_RETRY_BASE_SECONDS: int = 2
+    OUTBOX_RETRY_MAX_SECONDS: int = 300
+    OUTBOX_HTTP_TIMEOUT_SECONDS: float = 5.0
+    OUTBOX_LEASE_SECONDS: int = 30
+    EXPORT_FETCH_SIZE: int = 1000
+    EXPORT_WATERMARK_LAG_SECONDS: int = 5
+    FAST_JSON_RESPONSES: bool = False
+    PRODUCT_CHANGES_MAX_LIMIT: int = 1000
 
     class Config:
         env_file = ".env"
@@ -1,124 +1,234 @@
-from .db import get_connection
-import requests
-import os
-
-# Inventory Service URL inside Docker network
-INVENTORY_SYNC_URL = os.getenv("INVENTORY_SYNC_URL", "http://inventory-service:8000/v1/inventory/sync")
-def sync_with_inventory(product):
-    """Sync product info to the Inventory Service."""
-    try:
-        payload = {
-            "product_id": product["product_id"],
-        }
-        res = requests.post(INVENTORY_SYNC_URL, json=payload, timeout=5)
+from .db import get_connection, transaction
+from .cache import LRUTTLCache
+from . import changelog, facets, outbox, search
+from .config import settings
+import aiomysql
+from collections import Counter
+import base64
+import json
 
-        if res.status_code in (200, 201):
-            print(f"✅ Synced with Inventory: Product_id={product['product_id']}")
-        else:
-            print(f"⚠️ Failed to sync inventory ({res.status_code}): {res.text}")
+# Listing results keyed on the normalized fetch_products filters
+product_cache = LRUTTLCache(settings.PRODUCT_CACHE_MAX_ENTRIES, settings.PRODUCT_CACHE_TTL_SECONDS)
+
+def _encode_cursor(sort_by_price, row):
+    """Build an opaque keyset cursor pointing just after `row`."""
+    if sort_by_price in ('asc', 'desc'):
+        key = [str(row["price"]), row["product_id"]]
+    else:
+        key = [row["product_id"]]
+    payload = json.dumps({"s": sort_by_price or "id", "k": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def _decode_cursor(sort_by_price, cursor):
+    """Decode a cursor produced by `_encode_cursor` for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_key, key = payload["s"], payload["k"]
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if sort_key != (sort_by_price or "id"):
+        raise ValueError("Cursor does not match the requested sort order")
+    if len(key) != (2 if sort_by_price in ('asc', 'desc') else 1):
+        raise ValueError("Malformed cursor")
+    return key
 
-    except Exception as e:
-        print(f"🚫 Inventory sync error: {e}")
+def _cache_key(page, per_page, category, price_gt, price_lt, sort_by_price, substring, cursor, include_total):
+    """Normalize listing filters so equivalent requests share one cache entry."""
+    return (
+        1 if cursor else page,
+        per_page,
+        category or None,
+        float(price_gt) if price_gt is not None else None,
+        float(price_lt) if price_lt is not None else None,
+        sort_by_price if sort_by_price in ('asc', 'desc') else None,
+        substring or None,
+        cursor or None,
+        bool(include_total),
+    )
 
-def fetch_products(
+async def fetch_products(
     page=1,
     per_page=10,
     category=None,
     price_gt=None,
     price_lt=None,
     sort_by_price=None,
-    substring=None
+    substring=None,
+    cursor=None,
+    include_total=True
 ):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    """Return `(rows, total, next_cursor)` for one page of active products.
+
+    With `cursor` set the page is resolved by keyset (`(price, product_id)` or
+    `product_id`, depending on `sort_by_price`) and `page` is ignored, so deep
+    pages cost the same as the first one. `total` is None when
+    `include_total` is False.
+
+    Results are served from `product_cache` when possible; the write paths
+    below clear it.
+    """
+    key = _cache_key(page, per_page, category, price_gt, price_lt, sort_by_price, substring, cursor, include_total)
+    cached = product_cache.get(key)
+    if cached is not None:
+        return cached
 
-    query = "SELECT * FROM products WHERE 1=1"
-    count_query = "SELECT COUNT(*) as total FROM products WHERE 1=1"
+    generation = product_cache.generation
+    result = await _query_products(*key)
+    product_cache.set(key, result, generation)
+    return result
+
+def _filter_clause(category, price_gt, price_lt, substring):
+    """Build the `FROM ... WHERE ...` shared by listings, counts and facets."""
+    source = " FROM products p"
+    where = " WHERE p.is_active = TRUE"
     params = []
-    count_params = []
 
     # ---- Filters ----
     if category:
-        query += " AND category = %s"
-        count_query += " AND category = %s"
+        where += " AND p.category = %s"
         params.append(category)
-        count_params.append(category)
 
     if price_gt is not None:
-        query += " AND price >= %s"
-        count_query += " AND price >= %s"
+        where += " AND p.price >= %s"
         params.append(price_gt)
-        count_params.append(price_gt)
 
     if price_lt is not None:
-        query += " AND price <= %s"
-        count_query += " AND price <= %s"
+        where += " AND p.price <= %s"
         params.append(price_lt)
-        count_params.append(price_lt)
 
     if substring:
-        query += " AND name LIKE %s"
-        count_query += " AND name LIKE %s"
-        pattern = f"%{substring}%"
-        params.append(pattern)
-        count_params.append(pattern)
+        if search.is_indexable(substring):
+            # Candidates must own every trigram of the substring
+            grams = sorted(search.ngrams(substring))
+            placeholders = ", ".join(["%s"] * len(grams))
+            source += (
+                " JOIN (SELECT product_id FROM product_ngrams"
+                f" WHERE gram IN ({placeholders})"
+                " GROUP BY product_id HAVING COUNT(*) = %s) m ON m.product_id = p.product_id"
+            )
+            params = grams + [len(grams)] + params
+        # Verify the candidates (and handle substrings shorter than a trigram)
+        where += " AND (p.name LIKE %s OR p.sku LIKE %s)"
+        pattern = search.like_pattern(substring)
+        params.extend([pattern, pattern])
+
+    return source, where, params
 
-    # Always only show active products
-    query += " AND is_active = TRUE"
-    count_query += " AND is_active = TRUE"
+# Exactly the ProductOut fields, so rows can be serialized as-is
+PRODUCT_COLUMNS = "p.product_id, p.sku, p.name, p.category, p.price, p.is_active"
+
+def _normalize_row(row):
+    """Convert DB types to JSON-native ones (DECIMAL -> float, TINYINT -> bool) once per fetch."""
+    row["price"] = float(row["price"]) if row["price"] is not None else None
+    row["is_active"] = bool(row["is_active"])
+    return row
+
+def _is_precomputed_shape(price_gt, price_lt, substring):
+    """Filters that `product_facets` can answer: none, or category only."""
+    return price_gt is None and price_lt is None and not substring
+
+async def _query_products(page, per_page, category, price_gt, price_lt, sort_by_price, substring, cursor, include_total):
+    # Without an explicit price sort, substring matches are ranked by match quality
+    ranked = bool(substring) and sort_by_price not in ('asc', 'desc')
+    if ranked and cursor:
+        raise ValueError("Cursor pagination is not available for ranked substring search; pass sort_by_price")
+
+    source, where, params = _filter_clause(category, price_gt, price_lt, substring)
+
+    if _is_precomputed_shape(price_gt, price_lt, substring):
+        count_query = "SELECT COALESCE(SUM(active_count), 0) as total FROM product_facets"
+        count_params = []
+        if category:
+            count_query += " WHERE category = %s"
+            count_params.append(category)
+    else:
+        count_query = "SELECT COUNT(*) as total" + source + where
+        count_params = list(params)
+
+    # ---- Keyset position ----
+    if cursor:
+        key = _decode_cursor(sort_by_price, cursor)
+        if sort_by_price == 'desc':
+            where += " AND (p.price, p.product_id) < (%s, %s)"
+        elif sort_by_price == 'asc':
+            where += " AND (p.price, p.product_id) > (%s, %s)"
+        else:
+            where += " AND p.product_id > %s"
+        params.extend(key)
+
+    query = f"SELECT {PRODUCT_COLUMNS}" + source + where
 
     # ---- Sorting ----
+    # product_id breaks price ties so that keyset positions are unique
     if sort_by_price in ('asc', 'desc'):
-        query += f" ORDER BY price {sort_by_price.upper()}"
+        direction = sort_by_price.upper()
+        query += f" ORDER BY p.price {direction}, p.product_id {direction}"
+    elif ranked:
+        # exact name/SKU match, then prefix match, then shorter names first
+        query += (
+            " ORDER BY CASE WHEN p.name = %s OR p.sku = %s THEN 0"
+            " WHEN p.name LIKE %s OR p.sku LIKE %s THEN 1 ELSE 2 END,"
+            " CHAR_LENGTH(p.name), p.product_id"
+        )
+        prefix = search.like_pattern(substring, prefix_only=True)
+        params.extend([substring, substring, prefix, prefix])
     else:
-        query += " ORDER BY product_id ASC"
+        query += " ORDER BY p.product_id ASC"
 
     # ---- Pagination ----
-    query += " LIMIT %s OFFSET %s"
-    params.extend([per_page, (page - 1) * per_page])
+    if cursor:
+        query += " LIMIT %s"
+        params.append(per_page)
+    else:
+        query += " LIMIT %s OFFSET %s"
+        params.extend([per_page, (page - 1) * per_page])
 
     # ---- Execute ----
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-
-    cursor.execute(count_query, count_params)
-    total = cursor.fetchone()["total"]
-
-    conn.close()
-    return rows, total
-
-def create_product(product):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    cursor.execute("SELECT * FROM products WHERE sku = %s", (product.sku,))
-    existing = cursor.fetchone()
-
-    if existing:
-        # Either update it or raise a meaningful message
-        raise ValueError(f"Product with SKU {product.sku} already exists (id={existing['product_id']})")
-
-    
-    cursor.execute(
-        "INSERT INTO products (sku, name, category, price, is_active) VALUES (%s,%s,%s,%s,%s)",
-        (product.sku, product.name, product.category, product.price, product.is_active)
-    )
-    conn.commit()
-    product_id = cursor.lastrowid
-    
-    cursor.execute("SELECT * FROM products WHERE product_id=%s", (product_id,))
-    new_product = cursor.fetchone()
-    conn.close()
-    
-    if new_product:
-        sync_with_inventory(new_product)
-
-    return product_id
-
-def update_product(product_id, product_data):
-    conn = get_connection()
-    # Use dictionary cursor so fetched rows are dicts (not tuples)
-    cursor = conn.cursor(dictionary=True)
+    total = None
+    async with get_connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as db_cursor:
+            await db_cursor.execute(query, params)
+            rows = await db_cursor.fetchall()
+
+            if include_total:
+                await db_cursor.execute(count_query, count_params)
+                total = int((await db_cursor.fetchone())["total"])
+
+    next_cursor = None
+    if len(rows) == per_page and not ranked:
+        next_cursor = _encode_cursor(sort_by_price, rows[-1])
+    # Normalized before caching, so cache hits need no conversion
+    return [_normalize_row(row) for row in rows], total, next_cursor
+
+async def create_product(product):
+    """Insert one product and return its row.
+
+    A single transaction on one pooled connection: the unique SKU constraint
+    rejects duplicates (aiomysql.IntegrityError) instead of a pre-check
+    SELECT, and the row is built from the input plus the generated id rather
+    than re-read. The statements are the products INSERT plus one INSERT
+    each for the search index, facet counts and inventory outbox, and the
+    change-feed version bump and entry.
+    """
+    async with transaction() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "INSERT INTO products (sku, name, category, price, is_active) VALUES (%s,%s,%s,%s,%s)",
+                (product.sku, product.name, product.category, product.price, product.is_active)
+            )
+            product_id = cursor.lastrowid
+            if product.is_active:
+                await search.index_product(cursor, product_id, product.name, product.sku, replace=False)
+            await facets.apply_delta(cursor, facets.delta(after=product.dict()))
+            await outbox.enqueue(cursor, [product_id])
+            row = {"product_id": product_id, **product.dict()}
+            await changelog.record(cursor, [("insert", row)])
+    product_cache.clear()
+
+    return row
+
+async def update_product(product_id, product_data):
     fields = []
     values = []
     for k, v in product_data.items():
@@ -126,16 +236,30 @@ def update_product(product_id, product_data):
         values.append(v)
     values.append(product_id)
     query = f"UPDATE products SET {', '.join(fields)} WHERE product_id=%s"
-    cursor.execute(query, tuple(values))
-    conn.commit()
 
-    # Get the product post-update
-    cursor.execute("SELECT * FROM products WHERE product_id=%s", (product_id,))
-    row = cursor.fetchone()
+    async with transaction() as conn:
+        # Use dictionary cursor so fetched rows are dicts (not tuples)
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            # Lock the current row; its old values drive the facet delta
+            await cursor.execute("SELECT * FROM products WHERE product_id=%s FOR UPDATE", (product_id,))
+            before = await cursor.fetchone()
+
+            if not before:
+                return 0
 
-    if not row:
-        conn.close()
-        return 0
+            await cursor.execute(query, tuple(values))
+            row = {**before, **product_data}
+
+            # Keep the search index in step with renames and (de)activation
+            if 'name' in product_data or 'is_active' in product_data:
+                if row['is_active']:
+                    await search.index_product(cursor, row['product_id'], row['name'], row['sku'])
+                else:
+                    await search.remove_product(cursor, row['product_id'])
+            await facets.apply_delta(cursor, facets.delta(before, row))
+            await outbox.enqueue(cursor, [row['product_id']])
+            await changelog.record(cursor, [("update", row)])
+    product_cache.clear()
 
     # Normalize types for JSON/Pydantic
     try:
@@ -150,31 +274,29 @@ def update_product(product_id, product_data):
     except Exception:
         pass
 
-    conn.close()
-    if row:
-        sync_with_inventory(row)
     return row
 
-def soft_delete_product(product_id):
+async def soft_delete_product(product_id):
     """Soft-delete a product by product_id and return the product dict.
 
     Returns:
         dict: the product row (with `is_active` set to False) on success
         0: if no product was found to delete
     """
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # Get the product first
-    cursor.execute("SELECT * FROM products WHERE product_id=%s", (product_id,))
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        return 0
+    async with transaction() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            # Get the product first
+            await cursor.execute("SELECT * FROM products WHERE product_id=%s FOR UPDATE", (product_id,))
+            row = await cursor.fetchone()
+            if not row:
+                return 0
 
-    # Perform soft delete
-    cursor.execute("UPDATE products SET is_active=FALSE WHERE product_id=%s", (product_id,))
-    conn.commit()
+            # Perform soft delete
+            await cursor.execute("UPDATE products SET is_active=FALSE WHERE product_id=%s", (product_id,))
+            await search.remove_product(cursor, product_id)
+            await facets.apply_delta(cursor, facets.delta(before=row))
+            await changelog.record(cursor, [("delete", {**row, "is_active": False})])
+    product_cache.clear()
 
     # Normalize types for JSON/Pydantic
     try:
@@ -186,5 +308,162 @@ def soft_delete_product(product_id):
     # is_active stored as 1/0 or True/False; set to False because we soft-deleted
     row['is_active'] = False
 
-    conn.close()
     return row
+
+async def bulk_upsert_products(products):
+    """Insert or update many products (matched by SKU) in one transaction.
+
+    Returns one result dict per input item, in input order. Later duplicates
+    of a SKU within the batch are reported as errors and skipped. New
+    products are queued for inventory sync in the same transaction.
+    """
+    results = []
+    batch = {}
+    for product in products:
+        if product.sku in batch:
+            results.append({"sku": product.sku, "status": "error", "detail": "Duplicate SKU in batch"})
+            continue
+        batch[product.sku] = product
+        results.append({"sku": product.sku})
+
+    skus = list(batch)
+    placeholders = ", ".join(["%s"] * len(skus))
+
+    async with transaction() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(
+                f"SELECT product_id, sku, category, price, is_active FROM products"
+                f" WHERE sku IN ({placeholders}) FOR UPDATE", skus
+            )
+            existing = {row["sku"]: row for row in await cursor.fetchall()}
+
+            # executemany rewrites this into multi-row INSERT statements
+            await cursor.executemany(
+                """INSERT INTO products (sku, name, category, price, is_active)
+                   VALUES (%s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE
+                       name=VALUES(name),
+                       category=VALUES(category),
+                       price=VALUES(price),
+                       is_active=VALUES(is_active)""",
+                [(p.sku, p.name, p.category, p.price, p.is_active) for p in batch.values()]
+            )
+
+            await cursor.execute(
+                f"SELECT product_id, sku, name, is_active FROM products WHERE sku IN ({placeholders})", skus
+            )
+            ids = {row["sku"]: row["product_id"] for row in await cursor.fetchall()}
+
+            await search.index_products(
+                cursor, [(ids[sku], p.name, sku, p.is_active) for sku, p in batch.items()]
+            )
+            changes = Counter()
+            for sku, p in batch.items():
+                changes.update(facets.delta(existing.get(sku), p.dict()))
+            await facets.apply_delta(cursor, changes)
+            await outbox.enqueue(cursor, [ids[sku] for sku in batch if sku not in existing])
+            await changelog.record(cursor, [
+                ("update" if sku in existing else "insert", {"product_id": ids[sku], **p.dict()})
+                for sku, p in batch.items()
+            ])
+    product_cache.clear()
+
+    for result in results:
+        if "status" in result:
+            continue
+        sku = result["sku"]
+        result["product_id"] = ids[sku]
+        result["status"] = "updated" if sku in existing else "created"
+    return results
+
+async def fetch_facets(category=None, price_gt=None, price_lt=None, substring=None):
+    """Per-category and per-price-band counts of active products matching the filters.
+
+    Unfiltered and category-only requests are answered from `product_facets`;
+    other shapes fall back to one grouped query over the filtered products.
+    """
+    key = ("facets", category or None,
+           float(price_gt) if price_gt is not None else None,
+           float(price_lt) if price_lt is not None else None,
+           substring or None)
+    cached = product_cache.get(key)
+    if cached is not None:
+        return cached
+
+    precomputed = _is_precomputed_shape(price_gt, price_lt, substring)
+    if precomputed:
+        query = "SELECT category, price_band, active_count AS count FROM product_facets WHERE active_count > 0"
+        params = []
+        if category:
+            query += " AND category = %s"
+            params.append(category)
+    else:
+        source, where, params = _filter_clause(category, price_gt, price_lt, substring)
+        query = (
+            f"SELECT COALESCE(p.category, '') AS category, {facets.band_sql('p.price')} AS price_band,"
+            " COUNT(*) AS count" + source + where + " GROUP BY 1, 2"
+        )
+
+    generation = product_cache.generation
+    async with get_connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+
+    by_category = Counter()
+    by_band = Counter()
+    for row in rows:
+        by_category[row["category"]] += int(row["count"])
+        by_band[int(row["price_band"])] += int(row["count"])
+
+    bands = []
+    for band in range(len(facets.PRICE_BAND_EDGES)):
+        low, high = facets.band_bounds(band)
+        bands.append({"min": low, "max": high, "count": by_band[band]})
+
+    result = {
+        "total": sum(by_category.values()),
+        "categories": [
+            {"category": name or None, "count": count}
+            for name, count in sorted(by_category.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        "price_bands": bands,
+        "precomputed": precomputed,
+    }
+    product_cache.set(key, result, generation)
+    return result
+
+async def lookup_products(product_ids=(), skus=()):
+    """Fetch many products by product_id and/or SKU in one query.
+
+    Returns `(items, missing_ids, missing_skus)`; inactive products are
+    included so callers can tell "gone" from "unknown".
+    """
+    conditions = []
+    params = []
+    if product_ids:
+        conditions.append(f"product_id IN ({', '.join(['%s'] * len(product_ids))})")
+        params.extend(product_ids)
+    if skus:
+        conditions.append(f"sku IN ({', '.join(['%s'] * len(skus))})")
+        params.extend(skus)
+    if not conditions:
+        return [], [], []
+
+    async with get_connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(
+                "SELECT product_id, sku, name, price, is_active FROM products"
+                f" WHERE {' OR '.join(conditions)} ORDER BY product_id",
+                params
+            )
+            rows = await cursor.fetchall()
+
+    for row in rows:
+        _normalize_row(row)
+
+    found_ids = {row["product_id"] for row in rows}
+    found_skus = {row["sku"] for row in rows}
+    missing_ids = [product_id for product_id in product_ids if product_id not in found_ids]
+    missing_skus = [sku for sku in skus if sku not in found_skus]
+    return rows, missing_ids, missing_skus
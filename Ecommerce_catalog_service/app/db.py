@@ -1,17 +1,49 @@
-import mysql.connector
-from mysql.connector import pooling
+import aiomysql
+from contextlib import asynccontextmanager
 from .config import settings
 
-connection_pool = pooling.MySQLConnectionPool(
-    pool_name="catalog_pool",
-    pool_size=5,
-    pool_reset_session=True,
-    host=settings.MYSQL_HOST,
-    port=settings.MYSQL_PORT,
-    database=settings.MYSQL_DB,
-    user=settings.MYSQL_USER,
-    password=settings.MYSQL_PASSWORD
-)
+connection_pool = None
+
+async def init_pool():
+    """Create the shared async pool; called once on application startup."""
+    global connection_pool
+    connection_pool = await aiomysql.create_pool(
+        minsize=settings.MYSQL_POOL_MIN_SIZE,
+        maxsize=settings.MYSQL_POOL_MAX_SIZE,
+        pool_recycle=settings.MYSQL_POOL_RECYCLE_SECONDS,
+        # Each statement sees fresh data; writes open explicit transactions
+        autocommit=True,
+        host=settings.MYSQL_HOST,
+        port=settings.MYSQL_PORT,
+        db=settings.MYSQL_DB,
+        user=settings.MYSQL_USER,
+        password=settings.MYSQL_PASSWORD
+    )
+
+async def close_pool():
+    if connection_pool is not None:
+        connection_pool.close()
+        await connection_pool.wait_closed()
 
 def get_connection():
-    return connection_pool.get_connection()
+    """Borrow a pooled connection: `async with get_connection() as conn: ...`."""
+    return connection_pool.acquire()
+
+@asynccontextmanager
+async def transaction():
+    """Borrow a connection and run the block in one transaction (rolled back on error)."""
+    async with connection_pool.acquire() as conn:
+        await conn.begin()
+        try:
+            yield conn
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+
+async def ensure_tables(*ddl_statements):
+    """Create the auxiliary tables this service owns if they are missing."""
+    async with connection_pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            for ddl in ddl_statements:
+                await cursor.execute(ddl)
@@ -0,0 +1,105 @@
+"""
+Streaming catalog export (NDJSON / CSV).
+
+Rows come off an unbuffered server-side cursor (`SSDictCursor`) and are
+serialized in `EXPORT_FETCH_SIZE` chunks, so memory stays constant however
+large the catalog is. Every product carries an `updated_at` timestamp that
+MySQL bumps on each change; an `updated_since` watermark turns the export
+into an incremental one that also returns deactivated rows. Tables created
+before `updated_at` existed get it from `migrate.py`.
+"""
+
+import csv
+import io
+import json
+
+import aiomysql
+
+from .config import settings
+from .db import get_connection
+
+FIELDS = ("product_id", "sku", "name", "category", "price", "is_active", "updated_at")
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+async def current_watermark():
+    """Server time to pass back as `updated_since` on the next incremental export.
+
+    It lags by EXPORT_WATERMARK_LAG_SECONDS so rows from transactions still in
+    flight when this export started are picked up again next time.
+    """
+    async with get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "SELECT NOW(6) - INTERVAL %s SECOND", (settings.EXPORT_WATERMARK_LAG_SECONDS,)
+            )
+            (watermark,) = await cursor.fetchone()
+    return watermark
+
+
+def export_query(category=None, price_gt=None, price_lt=None, updated_since=None):
+    """Build the export SELECT; a full export walks the primary key, an incremental one `updated_at`."""
+    if updated_since is None:
+        where = " WHERE is_active = TRUE"
+        params = []
+        order = " ORDER BY product_id"
+    else:
+        # Deactivated rows are part of the change set
+        where = " WHERE updated_at >= %s"
+        params = [updated_since]
+        order = " ORDER BY updated_at, product_id"
+
+    if category:
+        where += " AND category = %s"
+        params.append(category)
+    if price_gt is not None:
+        where += " AND price >= %s"
+        params.append(price_gt)
+    if price_lt is not None:
+        where += " AND price <= %s"
+        params.append(price_lt)
+
+    return f"SELECT {', '.join(FIELDS)} FROM products" + where + order, params
+
+
+def _normalize(row):
+    row["price"] = float(row["price"]) if row["price"] is not None else None
+    row["is_active"] = bool(row["is_active"])
+    row["updated_at"] = row["updated_at"].isoformat()
+    return row
+
+
+def _ndjson(rows):
+    return "".join(json.dumps(_normalize(row)) + "\n" for row in rows)
+
+
+def _csv(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    if header:
+        writer.writeheader()
+    writer.writerows(_normalize(row) for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_products(fmt, category=None, price_gt=None, price_lt=None, updated_since=None):
+    """Yield the export body in chunks of EXPORT_FETCH_SIZE rows."""
+    query, params = export_query(category, price_gt, price_lt, updated_since)
+    if fmt == "csv":
+        yield _csv([], header=True)
+
+    async with get_connection() as conn:
+        cursor = await conn.cursor(aiomysql.SSDictCursor)
+        try:
+            await cursor.execute(query, params)
+            while True:
+                rows = await cursor.fetchmany(settings.EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                yield _csv(rows) if fmt == "csv" else _ndjson(rows)
+        except BaseException:
+            # Client went away mid-stream: drop the connection rather than
+            # reading the rest of the result set just to return it to the pool
+            conn.close()
+            raise
+        await cursor.close()
@@ -0,0 +1,100 @@
+"""
+Incrementally maintained category / price-band counts of active products.
+
+`product_facets` holds one row per `(category, price_band)` with the number
+of active products in it. The catalog write paths apply +1/-1 deltas inside
+their own transaction, so unfiltered and category-only listings can read
+their total (and the facet API its buckets) from a handful of rows instead of
+counting `products` live.
+
+Like `search`, this module has no DB/pool imports so `csv_loader.py` can
+reuse the SQL.
+"""
+
+from collections import Counter
+
+# Lower edges of the price bands; the last band is open-ended
+PRICE_BAND_EDGES = (0, 500, 1000, 2500, 5000)
+
+DDL = """
+CREATE TABLE IF NOT EXISTS product_facets (
+    category VARCHAR(100) NOT NULL DEFAULT '',
+    price_band SMALLINT NOT NULL,
+    active_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (category, price_band)
+);
+"""
+
+APPLY_DELTA_SQL = """
+    INSERT INTO product_facets (category, price_band, active_count) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE active_count = active_count + VALUES(active_count)
+"""
+
+
+def band_sql(column="price"):
+    """SQL CASE expression mapping `column` to its band index (NULL prices → band 0)."""
+    cases = " ".join(
+        f"WHEN {column} < {upper} THEN {band}"
+        for band, upper in enumerate(PRICE_BAND_EDGES[1:])
+    )
+    return f"CASE WHEN {column} IS NULL THEN 0 {cases} ELSE {len(PRICE_BAND_EDGES) - 1} END"
+
+
+# An upsert, so a rebuild racing another one (or a first write) cannot hit the primary key
+REBUILD_SQL = f"""
+    INSERT INTO product_facets (category, price_band, active_count)
+    SELECT COALESCE(category, ''), {band_sql()}, COUNT(*)
+    FROM products WHERE is_active = TRUE
+    GROUP BY 1, 2
+    ON DUPLICATE KEY UPDATE active_count = VALUES(active_count)
+"""
+
+
+def band_of(price):
+    if price is None:
+        return 0
+    band = 0
+    for index, lower in enumerate(PRICE_BAND_EDGES):
+        if price >= lower:
+            band = index
+    return band
+
+
+def band_bounds(band):
+    """`(min, max)` of a band; `max` is None for the open-ended top band."""
+    upper = PRICE_BAND_EDGES[band + 1] if band + 1 < len(PRICE_BAND_EDGES) else None
+    return PRICE_BAND_EDGES[band], upper
+
+
+def bucket(row):
+    """Facet bucket of a product row/dict, or None when it is not active."""
+    if not row["is_active"]:
+        return None
+    return (row["category"] or "", band_of(row["price"]))
+
+
+def delta(before=None, after=None):
+    """Counter of +/-1 changes for a product moving from `before` to `after`."""
+    changes = Counter()
+    if before is not None and bucket(before) is not None:
+        changes[bucket(before)] -= 1
+    if after is not None and bucket(after) is not None:
+        changes[bucket(after)] += 1
+    return changes
+
+
+async def apply_delta(cursor, changes):
+    """Apply a delta Counter; call inside the transaction that changed the products."""
+    rows = [(category, band, count) for (category, band), count in sorted(changes.items()) if count]
+    if rows:
+        await cursor.executemany(APPLY_DELTA_SQL, rows)
+
+
+def rebuild(conn):
+    """Recompute every bucket from `products` (blocking connection, used by the loader and migrate.py)."""
+    cursor = conn.cursor()
+    cursor.execute(DDL)
+    cursor.execute("DELETE FROM product_facets")
+    cursor.execute(REBUILD_SQL)
+    conn.commit()
+    cursor.close()
@@ -1,8 +1,14 @@
-from mysql.connector import errors as mysql_errors
-from fastapi import FastAPI, HTTPException, Query
+import aiomysql
+import asyncio
+import hashlib
+import json
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from datetime import datetime
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
 from typing import Optional
-from . import crud, schemas
+from . import changelog, crud, db, export, facets, outbox, outbox_dispatcher, schemas, search
+from .config import settings
 
 app = FastAPI(title="Catalog Service", version="1.0.0")
 
@@ -15,32 +21,139 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+@app.on_event("startup")
+async def startup_event():
+    await db.init_pool()
+    await db.ensure_tables(search.DDL, outbox.DDL, facets.DDL, *changelog.DDL)
+
+    # drain the inventory outbox in the background
+    app.state.outbox_task = None
+    if settings.OUTBOX_DISPATCHER_ENABLED:
+        app.state.outbox_task = asyncio.create_task(outbox_dispatcher.run_dispatcher())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if app.state.outbox_task is not None:
+        app.state.outbox_task.cancel()
+        try:
+            await app.state.outbox_task
+        except asyncio.CancelledError:
+            pass
+    await db.close_pool()
+
 @app.get("/v1/products", response_model=schemas.PaginatedProducts)
-def list_products(
+async def list_products(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, le=100),
     category: Optional[str] = None,
     price_gt: Optional[float] = None,
     price_lt: Optional[float] = None,
     sort_by_price: Optional[str] = Query(None, regex="^(asc|desc)$"),
+    substring: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True
+):
+    try:
+        items, total, next_cursor = await crud.fetch_products(
+            page, per_page, category, price_gt, price_lt, sort_by_price, substring,
+            cursor=cursor, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = {"items": items, "page": page, "per_page": per_page, "total": total, "next_cursor": next_cursor}
+    if settings.FAST_JSON_RESPONSES:
+        # Rows are already ProductOut-shaped and normalized by crud; skip re-validation
+        return ORJSONResponse(body)
+    return body
+
+@app.get("/v1/products/facets", response_model=schemas.ProductFacets)
+async def product_facets(
+    category: Optional[str] = None,
+    price_gt: Optional[float] = None,
+    price_lt: Optional[float] = None,
     substring: Optional[str] = None
 ):
-    items, total = crud.fetch_products(page, per_page, category, price_gt, price_lt, sort_by_price, substring)
-    return {"items": items, "page": page, "per_page": per_page, "total": total}
+    """Counts per category and per price band for the given listing filters."""
+    return await crud.fetch_facets(category, price_gt, price_lt, substring)
 
-@app.post("/v1/products", response_model=schemas.ProductOut, status_code=201)
-def create_product(product: schemas.ProductCreate):
+@app.get("/v1/products/export")
+async def export_products(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    category: Optional[str] = None,
+    price_gt: Optional[float] = None,
+    price_lt: Optional[float] = None,
+    updated_since: Optional[datetime] = None
+):
+    """Stream the whole active catalog (or everything changed since a watermark) as NDJSON or CSV.
+
+    The `X-Export-Watermark` response header is the `updated_since` to use for
+    the next incremental export; `X-Changes-Version` is the change-feed
+    version a replica bootstrapped from this export can resume from.
+    """
+    version = await changelog.current_version()
+    watermark = await export.current_watermark()
+    return StreamingResponse(
+        export.stream_products(format, category, price_gt, price_lt, updated_since),
+        media_type=export.MEDIA_TYPES[format],
+        headers={
+            "X-Export-Watermark": watermark.isoformat(),
+            "X-Changes-Version": str(version),
+            "Content-Disposition": f'attachment; filename="products.{format}"',
+        },
+    )
+
+@app.get("/v1/products/changes", response_model=schemas.ProductChanges)
+async def product_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=settings.PRODUCT_CHANGES_MAX_LIMIT)
+):
+    """Inserts, updates and soft-deletes after version `since`, oldest first.
+
+    Poll again with `since=next_since`; `has_more` means another batch is
+    already waiting.
+    """
+    changes, next_since, has_more = await changelog.fetch_changes(since, limit)
+    return {"changes": changes, "next_since": next_since, "has_more": has_more}
+
+def _split_keys(raw):
+    return [key.strip() for key in (raw or "").split(",") if key.strip()]
+
+@app.get("/v1/products/lookup", response_model=schemas.ProductLookup)
+async def lookup_products(
+    request: Request,
+    ids: Optional[str] = Query(None, description="Comma-separated product_ids"),
+    skus: Optional[str] = Query(None, description="Comma-separated SKUs")
+):
+    """Resolve many products by id and/or SKU in one query.
+
+    Responses carry an ETag; send it back as If-None-Match to get a 304
+    when none of the requested products changed.
+    """
     try:
-        product_id = crud.create_product(product)
+        product_ids = list(dict.fromkeys(int(key) for key in _split_keys(ids)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    sku_list = list(dict.fromkeys(_split_keys(skus)))
+    if not product_ids and not sku_list:
+        raise HTTPException(status_code=400, detail="Pass ids and/or skus")
+    if len(product_ids) + len(sku_list) > settings.PRODUCT_LOOKUP_MAX_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PRODUCT_LOOKUP_MAX_KEYS} keys per lookup")
 
-        # Fetch the newly created product for response
-        rows, total = crud.fetch_products(1, 1, None, None, None, None, product.name)
-        if not rows:
-            raise HTTPException(status_code=500, detail="Failed to fetch created product")
+    items, missing_ids, missing_skus = await crud.lookup_products(product_ids, sku_list)
+    body = {"items": items, "missing_ids": missing_ids, "missing_skus": missing_skus}
 
-        return rows[0]
+    etag = 'W/"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=body, headers=headers)
+
+@app.post("/v1/products", response_model=schemas.ProductOut, status_code=201)
+async def create_product(product: schemas.ProductCreate):
+    try:
+        return await crud.create_product(product)
 
-    except mysql_errors.IntegrityError as e:
+    except aiomysql.IntegrityError as e:
         # Check if duplicate SKU
         if "Duplicate entry" in str(e) and "sku" in str(e):
             raise HTTPException(status_code=409, detail=f"Product with SKU '{product.sku}' already exists.")
@@ -52,19 +165,77 @@ def create_product(product: schemas.ProductCreate):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 
+@app.post("/v1/products:bulk", response_model=schemas.ProductBulkResult)
+async def bulk_upsert_products(payload: schemas.ProductBulkUpsert):
+    """Create or update up to PRODUCT_BULK_MAX_ITEMS products (matched by SKU) in one transaction."""
+    results = await crud.bulk_upsert_products(payload.items)
+    return {
+        "created": sum(1 for r in results if r["status"] == "created"),
+        "updated": sum(1 for r in results if r["status"] == "updated"),
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "items": results,
+    }
+
+
 @app.put("/v1/products/{product_id}", response_model=schemas.ProductOut)
-def update_product(product_id: str, payload: schemas.ProductUpdate):
+async def update_product(product_id: str, payload: schemas.ProductUpdate):
     updates = {k: v for k, v in payload.dict().items() if v is not None}
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
-    updated = crud.update_product(product_id, updates)
+    updated = await crud.update_product(product_id, updates)
     if not updated:
         raise HTTPException(status_code=404, detail="Product not found")
     return updated
 
 @app.delete("/v1/products/{product_id}", response_model=schemas.ProductOut)
-def delete_product(product_id: str):
-    deleted = crud.soft_delete_product(product_id)
+async def delete_product(product_id: str):
+    deleted = await crud.soft_delete_product(product_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Product not found")
     return deleted
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus-style metrics for the listing cache and the inventory outbox."""
+    stats = crud.product_cache.stats()
+    outbox_stats = await outbox_dispatcher.stats()
+    lines = []
+    lines.append("# HELP catalog_product_cache_hits_total Listing cache hits")
+    lines.append("# TYPE catalog_product_cache_hits_total counter")
+    lines.append(f"catalog_product_cache_hits_total {stats['hits']}")
+
+    lines.append("# HELP catalog_product_cache_misses_total Listing cache misses")
+    lines.append("# TYPE catalog_product_cache_misses_total counter")
+    lines.append(f"catalog_product_cache_misses_total {stats['misses']}")
+
+    lines.append("# HELP catalog_product_cache_evictions_total Entries evicted by size or TTL")
+    lines.append("# TYPE catalog_product_cache_evictions_total counter")
+    lines.append(f"catalog_product_cache_evictions_total {stats['evictions']}")
+
+    lines.append("# HELP catalog_product_cache_entries Entries currently cached")
+    lines.append("# TYPE catalog_product_cache_entries gauge")
+    lines.append(f"catalog_product_cache_entries {stats['size']}")
+
+    lines.append("# HELP catalog_product_cache_max_entries Configured cache capacity")
+    lines.append("# TYPE catalog_product_cache_max_entries gauge")
+    lines.append(f"catalog_product_cache_max_entries {stats['max_entries']}")
+
+    lines.append("# HELP catalog_inventory_outbox_depth Product changes waiting to be synced to inventory")
+    lines.append("# TYPE catalog_inventory_outbox_depth gauge")
+    lines.append(f"catalog_inventory_outbox_depth {outbox_stats['depth']}")
+
+    lines.append("# HELP catalog_inventory_outbox_lag_seconds Age of the oldest unsynced product change")
+    lines.append("# TYPE catalog_inventory_outbox_lag_seconds gauge")
+    lines.append(f"catalog_inventory_outbox_lag_seconds {outbox_stats['lag_seconds']:.3f}")
+
+    lines.append("# HELP catalog_inventory_outbox_dispatched_total Outbox rows delivered by this worker")
+    lines.append("# TYPE catalog_inventory_outbox_dispatched_total counter")
+    lines.append(f"catalog_inventory_outbox_dispatched_total {outbox_stats['dispatched']}")
+
+    lines.append("# HELP catalog_inventory_outbox_failed_attempts_total Outbox rows rescheduled after a failed sync")
+    lines.append("# TYPE catalog_inventory_outbox_failed_attempts_total counter")
+    lines.append(f"catalog_inventory_outbox_failed_attempts_total {outbox_stats['failed_attempts']}")
+
+    output = "\n".join(lines) + "\n"
+    return Response(content=output, media_type="text/plain")
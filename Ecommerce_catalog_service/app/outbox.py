@@ -0,0 +1,37 @@
+"""
+Transactional outbox for catalog → inventory sync.
+
+Write paths call `enqueue()` with the cursor of their own transaction, so an
+outbox row exists if and only if the product change committed; the rows are
+drained by `outbox_dispatcher`, so catalog write latency never depends on
+inventory.
+
+Like `search`, this module has no DB/pool imports so `csv_loader.py` can
+queue the products it loads through `enqueue_blocking()`.
+"""
+
+DDL = """
+CREATE TABLE IF NOT EXISTS inventory_outbox (
+    outbox_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    last_error VARCHAR(255) NULL,
+    INDEX idx_inventory_outbox_due (next_attempt_at, outbox_id)
+);
+"""
+
+ENQUEUE_SQL = "INSERT INTO inventory_outbox (product_id) VALUES (%s)"
+
+
+async def enqueue(cursor, product_ids):
+    """Queue inventory syncs; call inside the transaction that changed the products."""
+    if product_ids:
+        await cursor.executemany(ENQUEUE_SQL, [(product_id,) for product_id in product_ids])
+
+
+def enqueue_blocking(cursor, product_ids):
+    """`enqueue()` for a blocking mysql.connector cursor (used by the loader)."""
+    if product_ids:
+        cursor.executemany(ENQUEUE_SQL, [(product_id,) for product_id in product_ids])
@@ -0,0 +1,134 @@
+"""
+Background dispatcher for the inventory outbox (see `outbox`).
+
+Drains due `inventory_outbox` rows in batches to the Inventory Service's
+batch sync endpoint, deleting them on success and rescheduling them with
+exponential backoff on failure. Batches are leased in a short transaction
+and posted outside it, so a slow inventory service holds neither row locks
+nor a pooled connection.
+"""
+
+import asyncio
+import os
+
+import aiomysql
+import httpx
+
+from .config import settings
+from .db import get_connection, transaction
+
+# Inventory Service URL inside Docker network
+INVENTORY_SYNC_URL = os.getenv("INVENTORY_SYNC_URL", "http://inventory-service:8000/v1/inventory/sync")
+INVENTORY_SYNC_BATCH_URL = os.getenv("INVENTORY_SYNC_BATCH_URL", INVENTORY_SYNC_URL.rstrip("/") + "/batch")
+
+# In-process dispatcher counters, exported on /metrics
+dispatched_total = 0
+failed_attempts_total = 0
+
+
+async def _post_batch(product_ids):
+    async with httpx.AsyncClient(timeout=settings.OUTBOX_HTTP_TIMEOUT_SECONDS) as client:
+        res = await client.post(INVENTORY_SYNC_BATCH_URL, json={"product_ids": product_ids})
+    if res.status_code not in (200, 201):
+        raise RuntimeError(f"Inventory sync returned {res.status_code}: {res.text[:200]}")
+
+
+async def _claim(batch_size):
+    """Lease up to `batch_size` due rows to this worker in one short transaction.
+
+    The lease is `next_attempt_at` pushed OUTBOX_LEASE_SECONDS ahead: other
+    workers skip the rows until it runs out, and rows of a worker that died
+    mid-send become due again by themselves.
+    """
+    async with transaction() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            # SKIP LOCKED lets several workers claim batches without waiting on each other
+            await cursor.execute(
+                """SELECT outbox_id, product_id FROM inventory_outbox
+                   WHERE next_attempt_at <= CURRENT_TIMESTAMP(6)
+                   ORDER BY next_attempt_at, outbox_id
+                   LIMIT %s FOR UPDATE SKIP LOCKED""",
+                (batch_size,)
+            )
+            rows = await cursor.fetchall()
+            if rows:
+                placeholders = ", ".join(["%s"] * len(rows))
+                await cursor.execute(
+                    f"""UPDATE inventory_outbox
+                        SET next_attempt_at = CURRENT_TIMESTAMP(6) + INTERVAL %s SECOND
+                        WHERE outbox_id IN ({placeholders})""",
+                    [settings.OUTBOX_LEASE_SECONDS] + [row["outbox_id"] for row in rows]
+                )
+    return rows
+
+
+async def dispatch_once(batch_size=None):
+    """Send one batch of due outbox rows; returns the number of rows processed.
+
+    No transaction or row lock is held while the batch is posted: the rows are
+    leased first, then deleted on success or rescheduled with backoff.
+    """
+    global dispatched_total, failed_attempts_total
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+
+    rows = await _claim(batch_size)
+    if not rows:
+        return 0
+
+    outbox_ids = [row["outbox_id"] for row in rows]
+    placeholders = ", ".join(["%s"] * len(outbox_ids))
+    try:
+        await _post_batch(sorted({row["product_id"] for row in rows}))
+    except Exception as e:
+        failed_attempts_total += len(rows)
+        print(f"🚫 Inventory sync error ({len(rows)} outbox rows rescheduled): {e}")
+        async with get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    f"""UPDATE inventory_outbox
+                        SET attempts = attempts + 1,
+                            next_attempt_at = CURRENT_TIMESTAMP(6)
+                                + INTERVAL LEAST(%s * POW(2, attempts), %s) SECOND,
+                            last_error = %s
+                        WHERE outbox_id IN ({placeholders})""",
+                    [settings.OUTBOX_RETRY_BASE_SECONDS, settings.OUTBOX_RETRY_MAX_SECONDS, str(e)[:255]] + outbox_ids
+                )
+        return len(rows)
+
+    async with get_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"DELETE FROM inventory_outbox WHERE outbox_id IN ({placeholders})", outbox_ids)
+    dispatched_total += len(rows)
+    return len(rows)
+
+
+async def run_dispatcher():
+    """Drain the outbox until cancelled; sleeps only when nothing is due."""
+    while True:
+        try:
+            processed = await dispatch_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"🚫 Outbox dispatcher error: {e}")
+            processed = 0
+        if processed < settings.OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+
+
+async def stats():
+    """Current outbox depth and the age in seconds of its oldest row."""
+    async with get_connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(
+                """SELECT COUNT(*) AS depth,
+                          COALESCE(TIMESTAMPDIFF(MICROSECOND, MIN(created_at), CURRENT_TIMESTAMP(6)), 0) AS lag_us
+                   FROM inventory_outbox"""
+            )
+            row = await cursor.fetchone()
+    return {
+        "depth": row["depth"],
+        "lag_seconds": row["lag_us"] / 1_000_000,
+        "dispatched": dispatched_total,
+        "failed_attempts": failed_attempts_total,
+    }
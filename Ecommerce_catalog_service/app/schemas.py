@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from datetime import datetime
+from typing import Literal, Optional
+from .config import settings
 
 class ProductBase(BaseModel):
     sku: str = Field(..., max_length=64)
@@ -24,4 +26,63 @@ class PaginatedProducts(BaseModel):
     items: list[ProductOut]
     page: int
     per_page: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class ProductBulkUpsert(BaseModel):
+    items: list[ProductCreate] = Field(..., min_length=1, max_length=settings.PRODUCT_BULK_MAX_ITEMS)
+
+class ProductBulkItemResult(BaseModel):
+    sku: str
+    product_id: Optional[int] = None
+    status: str  # created | updated | error
+    detail: Optional[str] = None
+
+class ProductBulkResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    items: list[ProductBulkItemResult]
+
+class CategoryFacet(BaseModel):
+    category: Optional[str] = None
+    count: int
+
+class PriceBandFacet(BaseModel):
+    min: float
+    max: Optional[float] = None  # None for the open-ended top band
+    count: int
+
+class ProductFacets(BaseModel):
     total: int
+    categories: list[CategoryFacet]
+    price_bands: list[PriceBandFacet]
+    precomputed: bool
+
+class ProductLookupItem(BaseModel):
+    product_id: int
+    sku: str
+    name: str
+    price: Optional[float] = None
+    is_active: bool
+
+class ProductLookup(BaseModel):
+    items: list[ProductLookupItem]
+    missing_ids: list[int]
+    missing_skus: list[str]
+
+class ProductChange(BaseModel):
+    version: int
+    op: Literal["insert", "update", "delete"]
+    product_id: int
+    sku: str
+    name: str
+    category: Optional[str] = None
+    price: Optional[float] = None
+    is_active: bool
+    changed_at: datetime
+
+class ProductChanges(BaseModel):
+    changes: list[ProductChange]
+    next_since: int
+    has_more: bool
@@ -0,0 +1,118 @@
+"""
+Trigram inverted index over product names and SKUs.
+
+`product_ngrams` holds one `(gram, product_id)` row per distinct lower-cased
+trigram of a product's name and SKU. A substring of at least `NGRAM_SIZE`
+characters can only occur in a product that owns every trigram of the
+substring, so listings resolve `substring` through the index and only verify
+the (already small) candidate set with LIKE.
+
+This module has no DB/pool imports so `csv_loader.py` can reuse it: the
+per-product helpers take the service's async cursor, `rebuild_index` takes
+the loader's blocking mysql.connector connection.
+"""
+
+NGRAM_SIZE = 3
+
+DDL = """
+CREATE TABLE IF NOT EXISTS product_ngrams (
+    gram VARBINARY(16) NOT NULL,
+    product_id INT NOT NULL,
+    PRIMARY KEY (gram, product_id),
+    INDEX idx_product_ngrams_product (product_id)
+);
+"""
+
+INSERT_SQL = "INSERT IGNORE INTO product_ngrams (gram, product_id) VALUES (%s, %s)"
+DELETE_SQL = "DELETE FROM product_ngrams WHERE product_id = %s"
+
+
+def ngrams(text):
+    """Return the set of lower-cased trigrams of `text` (empty if shorter)."""
+    text = (text or "").lower()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def product_ngrams(name, sku):
+    return ngrams(name) | ngrams(sku)
+
+
+def is_indexable(substring):
+    return substring is not None and len(substring) >= NGRAM_SIZE
+
+
+def like_pattern(substring, prefix_only=False):
+    """Escape LIKE wildcards in user input and wrap it for a contains/prefix match."""
+    escaped = substring.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix_only else f"%{escaped}%"
+
+
+async def index_product(cursor, product_id, name, sku, replace=True):
+    """Replace the index rows of one product (call inside the write transaction).
+
+    Pass `replace=False` for a brand-new product to skip the DELETE.
+    """
+    if replace:
+        await cursor.execute(DELETE_SQL, (product_id,))
+    rows = [(gram, product_id) for gram in product_ngrams(name, sku)]
+    if rows:
+        await cursor.executemany(INSERT_SQL, rows)
+
+
+async def index_products(cursor, products):
+    """Batch form of `index_product` for `(product_id, name, sku, is_active)` tuples.
+
+    Inactive products are only removed from the index.
+    """
+    product_ids = [product[0] for product in products]
+    if not product_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    await cursor.execute(f"DELETE FROM product_ngrams WHERE product_id IN ({placeholders})", product_ids)
+    rows = [
+        (gram, product_id)
+        for product_id, name, sku, is_active in products if is_active
+        for gram in product_ngrams(name, sku)
+    ]
+    if rows:
+        await cursor.executemany(INSERT_SQL, rows)
+
+
+async def remove_product(cursor, product_id):
+    await cursor.execute(DELETE_SQL, (product_id,))
+
+
+def rebuild_index(conn, batch_size=5000):
+    """Rebuild `product_ngrams` from the active rows of `products`.
+
+    Walks `products` in primary-key batches so memory stays bounded.
+    Returns the number of products indexed.
+    """
+    cursor = conn.cursor()
+    cursor.execute(DDL)
+    cursor.execute("TRUNCATE TABLE product_ngrams")
+
+    last_id = 0
+    indexed = 0
+    while True:
+        cursor.execute(
+            "SELECT product_id, name, sku FROM products"
+            " WHERE product_id > %s AND is_active = TRUE ORDER BY product_id LIMIT %s",
+            (last_id, batch_size)
+        )
+        products = cursor.fetchall()
+        if not products:
+            break
+        rows = [
+            (gram, product_id)
+            for product_id, name, sku in products
+            for gram in product_ngrams(name, sku)
+        ]
+        if rows:
+            cursor.executemany(INSERT_SQL, rows)
+        conn.commit()
+        indexed += len(products)
+        last_id = products[-1][0]
+
+    cursor.close()
+    return indexed
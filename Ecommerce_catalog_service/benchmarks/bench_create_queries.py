@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Regression check for the statements issued per `crud.create_product`.
+
+Creates products in a scratch database while counting pool checkouts and the
+SQL statements sent through aiomysql cursors, then fails (exit status 1) if a
+create needs more than one checkout, any SELECT, or more statements than the
+single-transaction path:
+
+    python -m benchmarks.bench_create_queries --password rootpass --creates 200
+
+It also tries a duplicate SKU, which must be rejected by the unique constraint
+(aiomysql.IntegrityError) within the same budget.
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import aiomysql
+import mysql.connector
+from aiomysql.cursors import Cursor
+from aiomysql.pool import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_loader import create_table_if_not_exists  # noqa: E402
+
+# products INSERT + search index INSERT + facet delta + outbox INSERT
+# + change-feed version bump + changelog INSERT
+EXPECTED_STATEMENTS = 6
+EXPECTED_CHECKOUTS = 1
+
+
+class StatementCounter:
+    """Counts pool checkouts and statements by patching aiomysql in place."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.statements = collections.Counter()
+
+    def reset(self):
+        self.checkouts = 0
+        self.statements.clear()
+
+    def install(self):
+        counter = self
+        original_query = Cursor._query
+        original_acquire = Pool._acquire
+
+        # executemany() goes through execute() -> _query() once per multi-row statement
+        async def _query(self, q):
+            counter.statements[q.lstrip().split(None, 1)[0].upper()] += 1
+            return await original_query(self, q)
+
+        async def _acquire(self):
+            counter.checkouts += 1
+            return await original_acquire(self)
+
+        Cursor._query = _query
+        Pool._acquire = _acquire
+
+
+async def run(args):
+    from app import changelog, crud, db, facets, outbox, schemas, search
+
+    counter = StatementCounter()
+    await db.init_pool()
+    await db.ensure_tables(search.DDL, outbox.DDL, facets.DDL, *changelog.DDL)
+    counter.install()
+    failures = []
+    try:
+        run_id = uuid.uuid4().hex[:8].upper()
+        samples = []
+        first = None
+        for i in range(args.creates):
+            product = schemas.ProductCreate(
+                sku=f"QC{run_id}{i:06d}", name=f"Query count product {i}",
+                category="Books", price=19.99, is_active=True,
+            )
+            counter.reset()
+            started = time.perf_counter()
+            row = await crud.create_product(product)
+            samples.append((time.perf_counter() - started) * 1000)
+            first = first or product
+
+            if row["product_id"] <= 0 or row["sku"] != product.sku:
+                failures.append(f"create {i} returned {row}")
+            statements = sum(counter.statements.values())
+            if statements > EXPECTED_STATEMENTS or counter.statements["SELECT"] or counter.checkouts > EXPECTED_CHECKOUTS:
+                failures.append(f"create {i}: {counter.checkouts} checkouts, {dict(counter.statements)}")
+
+        counter.reset()
+        try:
+            await crud.create_product(first)
+            failures.append("duplicate SKU was accepted")
+        except aiomysql.IntegrityError:
+            pass
+        if counter.statements["SELECT"] or counter.checkouts > EXPECTED_CHECKOUTS:
+            failures.append(f"duplicate create: {counter.checkouts} checkouts, {dict(counter.statements)}")
+
+        print(f"{args.creates} creates, median {statistics.median(samples):.2f} ms, "
+              f"p95 {statistics.quantiles(samples, n=20)[-1]:.2f} ms")
+    finally:
+        await db.close_pool()
+
+    for failure in failures[:20]:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: {EXPECTED_CHECKOUTS} checkout and at most {EXPECTED_STATEMENTS} statements (no SELECT) per create.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-create query count regression check")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--db", default="ecommerce_bench", help="Scratch database (created if missing)")
+    parser.add_argument("--creates", type=int, default=200)
+    args = parser.parse_args()
+
+    server = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password)
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.db}`")
+    server.close()
+
+    conn = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password, database=args.db)
+    create_table_if_not_exists(conn)
+    # The loader keeps the CSV's ids; the API relies on generated ones
+    cursor = conn.cursor()
+    cursor.execute("ALTER TABLE products MODIFY product_id INT NOT NULL AUTO_INCREMENT")
+    cursor.close()
+    conn.close()
+
+    os.environ.update({
+        "MYSQL_HOST": args.host,
+        "MYSQL_PORT": str(args.port),
+        "MYSQL_USER": args.user,
+        "MYSQL_PASSWORD": args.password,
+        "MYSQL_DB": args.db,
+        "OUTBOX_DISPATCHER_ENABLED": "false",
+    })
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
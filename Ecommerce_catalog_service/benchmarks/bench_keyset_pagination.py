@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark OFFSET vs keyset (cursor) paging of `crud.fetch_products`.
+
+Seeds a synthetic catalog into a dedicated database and reports the median
+latency of page 1 and a deep page for both modes:
+
+    python -m benchmarks.bench_keyset_pagination --password rootpass --rows 2000000
+
+Keyset latency should stay flat between page 1 and page 10,000 while the
+OFFSET latency grows with the page number. The run fails (exit 1) when a deep
+keyset page is more than `--max-ratio` times slower than the first one, or
+returns different rows than the same page fetched by OFFSET.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+import mysql.connector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_loader import create_table_if_not_exists  # noqa: E402
+from migrate import migrate  # noqa: E402
+
+CATEGORIES = ["Books", "Clothing", "Electronics", "Home", "Sports", "Toys"]
+
+
+def seed(conn, rows, batch_size=10_000):
+    """Fill `products` with `rows` synthetic active products (skipped if already there)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM products")
+    existing = cursor.fetchone()[0]
+    if existing >= rows:
+        print(f"Using existing {existing} rows.")
+        return
+
+    rng = random.Random(42)
+    sql = "INSERT INTO products (product_id, sku, name, category, price, is_active) VALUES (%s,%s,%s,%s,%s,%s)"
+    started = time.perf_counter()
+    for start in range(existing + 1, rows + 1, batch_size):
+        batch = [
+            (i, f"BENCH{i:09d}", f"Product {i}", rng.choice(CATEGORIES), round(rng.uniform(1, 5000), 2), True)
+            for i in range(start, min(start + batch_size, rows + 1))
+        ]
+        cursor.executemany(sql, batch)
+        conn.commit()
+    cursor.close()
+    print(f"Seeded {rows - existing} rows in {time.perf_counter() - started:.1f}s.")
+
+
+async def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run(args):
+    from app import crud, db
+
+    await db.init_pool()
+    failures = []
+    try:
+        print(f"{'sort':<6} {'page':>7} {'offset ms':>10} {'keyset ms':>10}")
+        for sort_by_price in (None, "asc", "desc"):
+            first_page_ms = None
+            for page in (1, args.deep_page):
+                cursor = None
+                if page > 1:
+                    # Position the cursor on the last row of the previous page (untimed)
+                    rows, _, _ = await crud.fetch_products(
+                        page - 1, args.per_page, sort_by_price=sort_by_price, include_total=False
+                    )
+                    cursor = crud._encode_cursor(sort_by_price, rows[-1])
+
+                offset = await median_ms(lambda: crud.fetch_products(
+                    page, args.per_page, sort_by_price=sort_by_price, include_total=False
+                ), args.repeat)
+                keyset = await median_ms(lambda: crud.fetch_products(
+                    page, args.per_page, sort_by_price=sort_by_price, cursor=cursor, include_total=False
+                ), args.repeat)
+                print(f"{sort_by_price or 'id':<6} {page:>7} {offset:>10.2f} {keyset:>10.2f}")
+
+                by_offset, _, _ = await crud.fetch_products(
+                    page, args.per_page, sort_by_price=sort_by_price, include_total=False
+                )
+                by_keyset, _, _ = await crud.fetch_products(
+                    page, args.per_page, sort_by_price=sort_by_price, cursor=cursor, include_total=False
+                )
+                if [row["product_id"] for row in by_keyset] != [row["product_id"] for row in by_offset]:
+                    failures.append(f"{sort_by_price or 'id'} page {page}: keyset and OFFSET rows differ")
+
+                if first_page_ms is None:
+                    first_page_ms = keyset
+                elif keyset > first_page_ms * args.max_ratio:
+                    failures.append(
+                        f"{sort_by_price or 'id'} page {page}: keyset {keyset:.2f} ms vs {first_page_ms:.2f} ms"
+                        f" on page 1 (over {args.max_ratio}x)"
+                    )
+    finally:
+        await db.close_pool()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: deep keyset pages within {args.max_ratio}x of page 1 and identical to OFFSET pages.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OFFSET vs keyset pagination benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--db", default="ecommerce_bench", help="Scratch database (created if missing)")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--deep-page", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="Fail when a deep keyset page is this many times slower than page 1")
+    args = parser.parse_args()
+
+    if args.deep_page * args.per_page > args.rows:
+        parser.error("--rows is too small for --deep-page * --per-page")
+
+    server = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password)
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.db}`")
+    server.close()
+
+    conn = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password, database=args.db)
+    create_table_if_not_exists(conn)
+    # A scratch table left by an older run may predate the keyset indexes
+    migrate(conn)
+    seed(conn, args.rows)
+
+    # The app reads its connection settings from the environment at import time
+    os.environ.update({
+        "MYSQL_HOST": args.host,
+        "MYSQL_PORT": str(args.port),
+        "MYSQL_USER": args.user,
+        "MYSQL_PASSWORD": args.password,
+        "MYSQL_DB": args.db,
+        # Measure the queries, not the listing cache
+        "PRODUCT_CACHE_MAX_ENTRIES": "0",
+    })
+    asyncio.run(run(args))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Check that `substring` search still finds products after `migrate.py` upgrades
+a catalog created by an older version.
+
+Recreates `products` in a dedicated database with the original schema (no
+`updated_at`, keyset indexes, facet counts or trigram index), seeds it, runs
+the same steps as `python migrate.py`, then compares `crud.fetch_products`
+search results with a plain `LIKE` scan of the table:
+
+    python -m benchmarks.check_migrated_search --password rootpass
+
+Exits with status 1 when any search returns different products.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+import mysql.connector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrate import build_facets, build_search_index, migrate  # noqa: E402
+
+LEGACY_DDL = """
+CREATE TABLE products (
+    product_id INT PRIMARY KEY,
+    sku VARCHAR(64) NOT NULL UNIQUE,
+    name VARCHAR(255) NOT NULL,
+    category VARCHAR(100),
+    price DECIMAL(10,2),
+    is_active BOOLEAN DEFAULT TRUE
+)
+"""
+
+NAMES = ["Walnut Desk", "Oak Bookshelf", "Steel Water Bottle", "Cotton T-Shirt", "Desk Lamp", "Running Shoes"]
+SEARCHES = ["desk", "Oak", "water bottle", "shirt", "CHK00001", "xyz"]
+
+
+def seed(conn, rows):
+    """Recreate `products` as an older version left it and fill it with `rows` products."""
+    cursor = conn.cursor()
+    for table in ("products", "product_facets", "product_ngrams"):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(LEGACY_DDL)
+    cursor.executemany(
+        "INSERT INTO products (product_id, sku, name, category, price, is_active) VALUES (%s,%s,%s,%s,%s,%s)",
+        [
+            (i, f"CHK{i:06d}", f"{NAMES[i % len(NAMES)]} {i}", "Home", 10 + i % 90, i % 7 != 0)
+            for i in range(1, rows + 1)
+        ]
+    )
+    conn.commit()
+    cursor.close()
+
+
+def expected_ids(conn, substring):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT product_id FROM products WHERE is_active = TRUE AND (name LIKE %s OR sku LIKE %s)",
+        (f"%{substring}%", f"%{substring}%")
+    )
+    ids = {product_id for (product_id,) in cursor.fetchall()}
+    cursor.close()
+    return ids
+
+
+async def search_ids(rows):
+    from app import crud, db
+
+    await db.init_pool()
+    try:
+        found = {}
+        for substring in SEARCHES:
+            items, _, _ = await crud.fetch_products(1, rows, substring=substring, include_total=False)
+            found[substring] = {row["product_id"] for row in items}
+        return found
+    finally:
+        await db.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search results after upgrading an old catalog with migrate.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--db", default="ecommerce_migrate_check", help="Scratch database (created if missing)")
+    parser.add_argument("--rows", type=int, default=100, help="Products to seed (at most 100 per search page)")
+    args = parser.parse_args()
+
+    server = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password)
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.db}`")
+    server.close()
+
+    conn = mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password, database=args.db)
+    seed(conn, args.rows)
+    migrate(conn)
+    build_facets(conn)
+    indexed = build_search_index(conn)
+    print(f"Migrated {args.rows} legacy products; search index built for {indexed}.")
+
+    # The app reads its connection settings from the environment at import time
+    os.environ.update({
+        "MYSQL_HOST": args.host,
+        "MYSQL_PORT": str(args.port),
+        "MYSQL_USER": args.user,
+        "MYSQL_PASSWORD": args.password,
+        "MYSQL_DB": args.db,
+        "PRODUCT_CACHE_MAX_ENTRIES": "0",
+    })
+    found = asyncio.run(search_ids(args.rows))
+
+    failures = []
+    for substring in SEARCHES:
+        expected = expected_ids(conn, substring)
+        if found[substring] != expected:
+            failures.append(f"'{substring}': {len(found[substring])} products found, {len(expected)} expected")
+    conn.close()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: searches on the migrated catalog match a LIKE scan.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Closed-loop load test for `GET /v1/products` at increasing concurrency.
+
+Start a single worker with the listing cache disabled so every request hits
+MySQL, then sweep the concurrency levels:
+
+    PRODUCT_CACHE_MAX_ENTRIES=0 MYSQL_POOL_MAX_SIZE=50 \\
+        uvicorn app.main:app --workers 1 --port 8000
+    python -m benchmarks.load_test --url http://localhost:8000 --levels 1,5,10,25,50
+
+With the old fixed five-connection pool throughput flattens at concurrency 5;
+on the async pool it keeps rising until MYSQL_POOL_MAX_SIZE or MySQL saturates.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client, url, deadline, max_page, latencies, errors):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        # Random pages keep requests from collapsing onto a few hot rows
+        params = {"page": rng.randint(1, max_page), "per_page": 20, "include_total": "false"}
+        started = time.perf_counter()
+        try:
+            res = await client.get(url, params=params)
+            if res.status_code != 200:
+                errors.append(res.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run_level(base_url, concurrency, duration, max_page):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            worker(client, f"{base_url}/v1/products", deadline, max_page, latencies, errors)
+            for _ in range(concurrency)
+        ))
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    return {
+        "rps": len(latencies) / duration,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p99": p99,
+        "errors": len(errors),
+    }
+
+
+async def main_async(args):
+    levels = [int(level) for level in args.levels.split(",")]
+    print(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in levels:
+        result = await run_level(args.url.rstrip("/"), concurrency, args.duration, args.max_page)
+        print(f"{concurrency:>11} {result['rps']:>9.1f} {result['p50']:>8.2f} {result['p99']:>8.2f} {result['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog listing load test")
+    parser.add_argument("--url", default="http://localhost:8000", help="Catalog service base URL")
+    parser.add_argument("--levels", default="1,5,10,25,50", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per level")
+    parser.add_argument("--max-page", type=int, default=5, help="Highest page number to request")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
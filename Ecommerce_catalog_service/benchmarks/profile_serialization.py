@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+CPU profile of `GET /v1/products` with and without FAST_JSON_RESPONSES.
+
+Drives the real app in-process (FastAPI TestClient) against the configured
+database, first through `response_model` validation + stdlib JSON ("before")
+and then through the orjson fast path ("after"), and prints CPU time per
+request plus the top functions of each cProfile run:
+
+    MYSQL_PASSWORD=rootpass python -m benchmarks.profile_serialization --per-page 100
+
+The listing cache stays on, so after the first request the profile is almost
+entirely response building. `--dump-dir` writes the raw .prof files (e.g. for
+snakeviz).
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OUTBOX_DISPATCHER_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def profile(client, params, fast, requests, dump_dir=None):
+    settings.FAST_JSON_RESPONSES = fast
+    # Warm the cache and check the two paths agree before measuring
+    body = client.get("/v1/products", params=params).json()
+
+    profiler = cProfile.Profile()
+    started = time.process_time()
+    profiler.enable()
+    for _ in range(requests):
+        client.get("/v1/products", params=params)
+    profiler.disable()
+    cpu_ms = (time.process_time() - started) * 1000 / requests
+
+    label = "after (orjson)" if fast else "before (response_model)"
+    print(f"\n=== {label}: {cpu_ms:.3f} ms CPU per request ===")
+    stats = pstats.Stats(profiler).strip_dirs().sort_stats("cumulative")
+    stats.print_stats(15)
+    if dump_dir:
+        os.makedirs(dump_dir, exist_ok=True)
+        stats.dump_stats(os.path.join(dump_dir, f"list_products_{'fast' if fast else 'default'}.prof"))
+    return body, cpu_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile listing serialization with and without the fast path")
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--dump-dir", help="Directory for the raw cProfile output")
+    args = parser.parse_args()
+
+    params = {"per_page": args.per_page, "include_total": "false"}
+    with TestClient(app) as client:
+        before, before_ms = profile(client, params, False, args.requests, args.dump_dir)
+        after, after_ms = profile(client, params, True, args.requests, args.dump_dir)
+
+    if before != after:
+        sys.exit("Fast path returned a different body than the response_model path")
+    print(f"\nCPU per request: {before_ms:.3f} ms -> {after_ms:.3f} ms ({before_ms / after_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,39 @@
 #!/usr/bin/env python3
 """
-Simple CSV → MySQL loader for product catalog.
+Streaming CSV → MySQL loader for product catalog.
+
+Rows are read lazily and upserted in multi-row `executemany` batches, one
+commit per `--commit-every` rows, so memory stays bounded by one chunk
+whatever the file size. Each chunk goes through the same side effects as
+`POST /v1/products:bulk`, in its own transaction: every row is appended to
+the change feed (`products_changelog`) and new products are queued in
+`inventory_outbox` for the inventory sync. The search index and facet
+counts are rebuilt once at the end.
+
+Running API workers keep serving cached listings until their entries expire
+(`PRODUCT_CACHE_TTL_SECONDS`): the cache is per process and the loader
+cannot clear it.
 """
 
 import csv
+import itertools
+import time
 import mysql.connector
 import argparse
+from app import changelog, facets, outbox, search
+
+UPSERT_SQL = """
+    INSERT INTO products (product_id, sku, name, category, price, is_active)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        sku=VALUES(sku),
+        name=VALUES(name),
+        category=VALUES(category),
+        price=VALUES(price),
+        is_active=VALUES(is_active)
+"""
+
+FIELDS = ("product_id", "sku", "name", "category", "price", "is_active")
 
 def connect_db(host, user, password, database):
     """Establish a connection to MySQL."""
@@ -26,49 +54,100 @@ def create_table_if_not_exists(conn):
         name VARCHAR(255) NOT NULL,
         category VARCHAR(100),
         price DECIMAL(10,2),
-        is_active BOOLEAN DEFAULT TRUE
+        is_active BOOLEAN DEFAULT TRUE,
+        updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+        INDEX idx_products_updated_at (updated_at, product_id),
+        -- keyset pagination: (is_active, price, product_id) / (is_active, category, ...)
+        INDEX idx_products_active_price (is_active, price, product_id),
+        INDEX idx_products_active_category_price (is_active, category, price, product_id)
     );
     """
     cursor.execute(ddl)
+    # The loader writes to the change feed and the outbox before the API may have run
+    for statement in (outbox.DDL, *changelog.DDL):
+        cursor.execute(statement)
     conn.commit()
     cursor.close()
     print("✅ Ensured table 'products' exists.")
 
-def load_csv(csv_path, conn):
-    """Read the CSV and insert/update rows."""
-    cursor = conn.cursor()
-    with open(csv_path, newline='') as csvfile:
-        # Try to detect delimiter automatically, but assume tab if not comma-separated
-        sample = csvfile.read(1024)
-        csvfile.seek(0)
-        dialect = csv.Sniffer().sniff(sample, delimiters="\t,")
-        reader = csv.DictReader(csvfile, dialect=dialect)
-
-        for row in reader:
-
-            sql = """
-                INSERT INTO products (product_id, sku, name, category, price, is_active)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    sku=VALUES(sku),
-                    name=VALUES(name),
-                    category=VALUES(category),
-                    price=VALUES(price),
-                    is_active=VALUES(is_active);
-            """
-            vals = (
-                int(row['product_id']),
-                row['sku'],
-                row['name'],
-                row['category'],
-                float(row['price']),
-                bool(row['is_active'])
-            )
-            cursor.execute(sql, vals)
+def parse_bool(value):
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+def row_values(row):
+    """Convert one CSV record into the UPSERT_SQL parameter tuple."""
+    return (
+        int(row['product_id']),
+        row['sku'],
+        row['name'],
+        row['category'],
+        float(row['price']),
+        parse_bool(row['is_active'])
+    )
 
+def sniff_dialect(csvfile):
+    # Try to detect delimiter automatically, but assume tab if not comma-separated
+    sample = csvfile.read(1024)
+    csvfile.seek(0)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters="\t,")
+    except csv.Error:
+        return csv.get_dialect('excel')
+
+def iter_chunks(reader, size):
+    """Yield chunks of at most `size` converted rows."""
+    while True:
+        chunk = [row_values(row) for row in itertools.islice(reader, size)]
+        if not chunk:
+            return
+        yield chunk
+
+def write_chunk(conn, chunk, batch_size):
+    """Upsert one chunk with its change-feed entries and outbox rows, and commit it."""
+    product_ids = [values[0] for values in chunk]
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT product_id FROM products WHERE product_id IN ({', '.join(['%s'] * len(product_ids))})"
+        " FOR UPDATE", product_ids
+    )
+    existing = {product_id for (product_id,) in cursor.fetchall()}
+    for i in range(0, len(chunk), batch_size):
+        cursor.executemany(UPSERT_SQL, chunk[i:i + batch_size])
+    # New products only, like the bulk upsert endpoint
+    outbox.enqueue_blocking(cursor, [product_id for product_id in product_ids if product_id not in existing])
+    changelog.record_blocking(cursor, [
+        ("update" if values[0] in existing else "insert", dict(zip(FIELDS, values)))
+        for values in chunk
+    ])
     conn.commit()
     cursor.close()
-    print("✅ CSV data successfully loaded into 'products' table.")
+
+def load_csv(csv_path, conn, batch_size=1000, commit_every=10000):
+    """Stream the CSV into `products`, one transaction per `commit_every` rows."""
+    rows = 0
+    started = last_report = time.perf_counter()
+    with open(csv_path, newline='') as csvfile:
+        reader = csv.DictReader(csvfile, dialect=sniff_dialect(csvfile))
+        for chunk in iter_chunks(reader, commit_every):
+            write_chunk(conn, chunk, batch_size)
+            rows += len(chunk)
+            now = time.perf_counter()
+            if now - last_report >= 5.0:
+                last_report = now
+                print(f"… {rows} rows loaded ({rows / (now - started):,.0f} rows/s)")
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ CSV data successfully loaded into 'products' table: "
+          f"{rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s).")
+
+def rebuild_search_index(conn):
+    """Rebuild the trigram search index from the loaded products."""
+    indexed = search.rebuild_index(conn)
+    print(f"✅ Search index rebuilt for {indexed} active products.")
+
+def rebuild_facets(conn):
+    """Recompute the category / price-band counts from the loaded products."""
+    facets.rebuild(conn)
+    print("✅ Product facet counts rebuilt.")
 
 def main():
     parser = argparse.ArgumentParser(description="Load CSV into MySQL 'products' table")
@@ -77,11 +156,18 @@ def main():
     parser.add_argument("--user", default="root", help="MySQL username")
     parser.add_argument("--password", required=True, help="MySQL password")
     parser.add_argument("--db", default="ecommerce", help="Target database name")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per multi-row INSERT")
+    parser.add_argument("--commit-every", type=int, default=10000, help="Rows per transaction / chunk")
+    parser.add_argument("--rebuild-search-index", action="store_true",
+                        help="Only rebuild the product search index and facet counts, without loading the CSV")
     args = parser.parse_args()
 
     conn = connect_db(args.host, args.user, args.password, args.db)
     create_table_if_not_exists(conn)
-    load_csv(args.csv, conn)
+    if not args.rebuild_search_index:
+        load_csv(args.csv, conn, args.batch_size, args.commit_every)
+    rebuild_search_index(conn)
+    rebuild_facets(conn)
     conn.close()
 
 if __name__ == "__main__":
@@ -9,3 +9,53 @@ CREATE TABLE IF NOT EXISTS catalogue (
   price DECIMAL(10,2),
   is_active BOOLEAN DEFAULT TRUE
 );
+
+-- Trigram search index over product names and SKUs (see app/search.py)
+CREATE TABLE IF NOT EXISTS product_ngrams (
+  gram VARBINARY(16) NOT NULL,
+  product_id INT NOT NULL,
+  PRIMARY KEY (gram, product_id),
+  INDEX idx_product_ngrams_product (product_id)
+);
+
+-- Transactional outbox for catalog -> inventory sync (see app/outbox.py)
+CREATE TABLE IF NOT EXISTS inventory_outbox (
+  outbox_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  product_id INT NOT NULL,
+  created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  attempts INT NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  last_error VARCHAR(255) NULL,
+  INDEX idx_inventory_outbox_due (next_attempt_at, outbox_id)
+);
+
+-- Active product counts per (category, price band) (see app/facets.py)
+CREATE TABLE IF NOT EXISTS product_facets (
+  category VARCHAR(100) NOT NULL DEFAULT '',
+  price_band SMALLINT NOT NULL,
+  active_count INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (category, price_band)
+);
+
+-- `products` is created by csv_loader.py with its change watermark (`updated_at`, see
+-- app/export.py) and keyset indexes; `python migrate.py` adds them to older tables.
+
+-- Product change feed (see app/changelog.py)
+CREATE TABLE IF NOT EXISTS product_version_seq (
+  id TINYINT PRIMARY KEY,
+  version BIGINT NOT NULL
+);
+INSERT IGNORE INTO product_version_seq (id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS products_changelog (
+  version BIGINT PRIMARY KEY,
+  op VARCHAR(8) NOT NULL,
+  product_id INT NOT NULL,
+  sku VARCHAR(64) NOT NULL,
+  name VARCHAR(255) NOT NULL,
+  category VARCHAR(100),
+  price DECIMAL(10,2),
+  is_active BOOLEAN NOT NULL,
+  changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  INDEX idx_products_changelog_product (product_id, version)
+);
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Schema upgrades for an existing `products` table.
+
+`csv_loader.py` creates `products` with every column and index the service
+relies on, but `CREATE TABLE IF NOT EXISTS` leaves a table created by an older
+version as it was. Run this once per database after upgrading, before the new
+API workers start:
+
+    python migrate.py --host 127.0.0.1 --password rootpass --db ecommerce
+
+Only what is missing is added, in a single `ALTER TABLE ... LOCK=NONE`, so
+reads and writes carry on while InnoDB rebuilds the table and a rerun is a
+no-op. The API never alters `products` itself. The derived tables the API
+only creates at startup are filled from `products` when they are empty (first
+upgrade to them): `product_facets` (precomputed facet counts) and
+`product_ngrams` (the trigram index every `substring` search of three or more
+characters joins against, so without it those searches find nothing).
+"""
+
+import argparse
+
+from app import facets, search
+from csv_loader import connect_db
+
+PRODUCT_COLUMNS = {
+    # change watermark for incremental exports (see app/export.py)
+    "updated_at": "TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+}
+
+PRODUCT_INDEXES = {
+    "idx_products_updated_at": ("updated_at", "product_id"),
+    # keyset pagination: (is_active, price, product_id) / (is_active, category, ...)
+    "idx_products_active_price": ("is_active", "price", "product_id"),
+    "idx_products_active_category_price": ("is_active", "category", "price", "product_id"),
+}
+
+
+def pending_changes(cursor, table, columns, indexes):
+    """`ADD COLUMN` / `ADD INDEX` clauses for the `columns` ({name: definition}) and
+    `indexes` ({name: columns}) that `table` lacks.
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS"
+        " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+    )
+    existing_columns = {name for (name,) in cursor.fetchall()}
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS"
+        " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+    )
+    existing_indexes = {name for (name,) in cursor.fetchall()}
+    return [
+        f"ADD COLUMN {name} {definition}"
+        for name, definition in columns.items() if name not in existing_columns
+    ] + [
+        f"ADD INDEX {name} ({', '.join(index_columns)})"
+        for name, index_columns in indexes.items() if name not in existing_indexes
+    ]
+
+
+def migrate(conn):
+    """Bring `products` up to date; returns the clauses that were applied."""
+    cursor = conn.cursor()
+    changes = pending_changes(cursor, "products", PRODUCT_COLUMNS, PRODUCT_INDEXES)
+    if changes:
+        cursor.execute(f"ALTER TABLE products {', '.join(changes)}, LOCK=NONE")
+    cursor.close()
+    return changes
+
+
+def _is_empty(conn, table, ddl):
+    cursor = conn.cursor()
+    cursor.execute(ddl)
+    cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+    empty = cursor.fetchone() is None
+    cursor.close()
+    return empty
+
+
+def build_facets(conn):
+    """Fill `product_facets` when it has no rows yet; returns whether it did."""
+    empty = _is_empty(conn, "product_facets", facets.DDL)
+    if empty:
+        facets.rebuild(conn)
+    return empty
+
+
+def build_search_index(conn):
+    """Fill `product_ngrams` when it has no rows yet; returns the products indexed, or None."""
+    if not _is_empty(conn, "product_ngrams", search.DDL):
+        return None
+    return search.rebuild_index(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add missing columns and indexes to 'products' and fill empty derived tables")
+    parser.add_argument("--host", default="127.0.0.1", help="MySQL host")
+    parser.add_argument("--user", default="root", help="MySQL username")
+    parser.add_argument("--password", required=True, help="MySQL password")
+    parser.add_argument("--db", default="ecommerce", help="Target database name")
+    args = parser.parse_args()
+
+    conn = connect_db(args.host, args.user, args.password, args.db)
+    try:
+        changes = migrate(conn)
+        for change in changes:
+            print(f"✅ {change}")
+        if not changes:
+            print("✅ 'products' is up to date.")
+        if build_facets(conn):
+            print("✅ Product facet counts built.")
+        indexed = build_search_index(conn)
+        if indexed is not None:
+            print(f"✅ Product search index built for {indexed} products.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
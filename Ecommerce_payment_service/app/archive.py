@@ -0,0 +1,127 @@
+"""
+Hot/cold tiering for payments.
+
+Payments older than PAYMENT_ARCHIVE_AFTER_DAYS are moved from `payments` to
+`payments_archive` (same columns and indexes) in small batches, each batch
+one transaction that copies and deletes the same locked rows, with a pause in
+between so the archiver does not starve live traffic. Run it periodically:
+
+    python -m app.archive
+
+Because the archiver only ever uses the configured age, every archived row
+is older than `cutoff()`. `crud.fetch_payments` therefore reads the archive
+only when the requested range starts before the cutoff, and lookups/refunds
+by id or order fall back to the archive. Counters and rollups are totals over
+both tiers and are not touched by a move.
+
+Like `counters`, this module has no DB/pool imports so `csv_loader.py` can
+reuse the DDL.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+TABLE = "payments_archive"
+
+# Hot table first: a row being archived is read from `payments` until the move commits
+TIERS = ("payments", TABLE)
+
+# payment_id keeps the hot table's values, so no AUTO_INCREMENT here
+DDL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE} (
+    payment_id INT PRIMARY KEY,
+    order_id INT NOT NULL,
+    amount DECIMAL(10,2),
+    method VARCHAR(255) NOT NULL,
+    status BOOLEAN,
+    reference VARCHAR(100) UNIQUE,
+    created_at TIMESTAMP,
+    refunded BOOLEAN NOT NULL DEFAULT 0,
+    refunded_at TIMESTAMP(6) NULL,
+    INDEX idx_payments_archive_created (created_at, payment_id),
+    INDEX idx_payments_archive_order_created (order_id, created_at, payment_id),
+    INDEX idx_payments_archive_method_status_created (method, status, created_at, payment_id),
+    INDEX idx_payments_archive_status_created (status, created_at, payment_id),
+    INDEX idx_payments_archive_refunded_at (refunded_at)
+);
+"""
+
+COLUMNS = "payment_id, order_id, amount, method, status, reference, created_at, refunded, refunded_at"
+
+
+def cutoff(after_days, now=None):
+    """Payments created before this instant belong to the archive tier."""
+    return (now or datetime.now()) - timedelta(days=after_days)
+
+
+def archive_batch(conn, before, batch_size):
+    """Move up to `batch_size` of the oldest payments created before `before`; returns the count."""
+    cursor = conn.cursor()
+    try:
+        # Locks the rows so a concurrent refund lands either before the copy or in the archive
+        cursor.execute(
+            "SELECT payment_id FROM payments WHERE created_at < %s"
+            " ORDER BY created_at, payment_id LIMIT %s FOR UPDATE",
+            (before, batch_size)
+        )
+        ids = [payment_id for (payment_id,) in cursor.fetchall()]
+        if ids:
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM payments"
+                f" WHERE payment_id IN ({placeholders})",
+                ids
+            )
+            cursor.execute(f"DELETE FROM payments WHERE payment_id IN ({placeholders})", ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(ids)
+
+
+def archive(conn, before, batch_size=1000, pause=0.1, max_batches=None, progress=None):
+    """Move every payment created before `before`, one throttled batch at a time; returns the count."""
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(conn, before, batch_size)
+        moved += count
+        batches += 1
+        if progress:
+            progress(moved)
+        if count < batch_size:
+            break
+        time.sleep(pause)
+    return moved
+
+
+def main():
+    import argparse
+
+    from .config import settings
+    from .db import get_connection
+
+    parser = argparse.ArgumentParser(
+        description=f"Move payments older than PAYMENT_ARCHIVE_AFTER_DAYS ({settings.PAYMENT_ARCHIVE_AFTER_DAYS}) to {TABLE}"
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.PAYMENT_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.PAYMENT_ARCHIVE_PAUSE_SECONDS,
+                        help="Seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+    args = parser.parse_args()
+
+    before = cutoff(settings.PAYMENT_ARCHIVE_AFTER_DAYS)
+    conn = get_connection()
+    try:
+        moved = archive(conn, before, args.batch_size, args.pause, args.max_batches,
+                        progress=lambda moved: print(f"… {moved} payments archived"))
+    finally:
+        conn.close()
+    print(f"✅ Archived {moved} payments created before {before:%Y-%m-%d %H:%M:%S}.")
+
+
+if __name__ == "__main__":
+    main()
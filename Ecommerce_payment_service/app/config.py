@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 class Settings(BaseSettings):
@@ -7,6 +7,30 @@ class Settings(BaseSettings):
     MYSQL_USER: str = "root"
     MYSQL_PASSWORD: str = ""  # Default empty, must be provided via environment variable
     MYSQL_DB: str = "ecommerce"
+    # Serve listings with orjson and skip response_model re-validation
+    FAST_JSON_RESPONSES: bool = False
+    PAYMENT_BATCH_MAX_ITEMS: int = 500
+    # Most order ids one GET /v1/orders/payments request may ask for
+    ORDER_PAYMENTS_MAX_IDS: int = 500
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_CACHE_MAX_ENTRIES: int = 10000
+    IDEMPOTENCY_CACHE_TTL_SECONDS: float = 300.0
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = 60.0
+    # Largest number of buckets one /v1/payments/rollups request may span
+    PAYMENT_ROLLUP_MAX_BUCKETS: int = 2000
+    # Payments older than this move to payments_archive (python -m app.archive)
+    PAYMENT_ARCHIVE_AFTER_DAYS: int = 365
+    PAYMENT_ARCHIVE_BATCH_SIZE: int = 1000
+    PAYMENT_ARCHIVE_PAUSE_SECONDS: float = 0.1
+    # Rows per fetch of the streaming settlement export
+    SETTLEMENT_FETCH_SIZE: int = 1000
+    # Simulated gateway (app/simulation.py); a seed makes outcome sequences reproducible
+    PAYMENT_SIM_SEED: Optional[int] = None
+    PAYMENT_SIM_SUCCESS_RATES: Dict[str, float] = {"COD": 0.6, "CARD": 0.6, "UPI": 0.6}
+    PAYMENT_SIM_LATENCY: str = "none"  # none | fixed | uniform | exponential
+    PAYMENT_SIM_LATENCY_MS: float = 0.0
+    # Expose POST /v1/payments/simulation/reset (load-test environments only)
+    PAYMENT_SIM_RESET_ENABLED: bool = False
 
     class Config:
         env_file = ".env"
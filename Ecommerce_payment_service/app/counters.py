@@ -0,0 +1,98 @@
+"""
+Incrementally maintained payment counters for `/metrics`.
+
+`payment_counters` holds one row per payment method with its total, failed
+and refunded counts. The charge and refund paths bump them inside their own
+transaction, so a Prometheus scrape reads a few rows instead of counting
+`payments`.
+
+This module has no DB/pool imports so `csv_loader.py` can reuse it to
+rebuild the counters after a bulk load; `python -m app.counters` rebuilds
+them against the app database (once after upgrading to counters).
+"""
+
+DDL = """
+CREATE TABLE IF NOT EXISTS payment_counters (
+    method VARCHAR(255) PRIMARY KEY,
+    payments_total BIGINT NOT NULL DEFAULT 0,
+    failed_total BIGINT NOT NULL DEFAULT 0,
+    refunded_total BIGINT NOT NULL DEFAULT 0
+);
+"""
+
+# status NULL counts as neither failed nor successful, like the old status filter;
+# archived payments (see archive.py) still count
+REBUILD_SQL = """
+    INSERT INTO payment_counters (method, payments_total, failed_total, refunded_total)
+    SELECT method, COUNT(*), COALESCE(SUM(status = 0), 0), COALESCE(SUM(refunded = 1), 0)
+    FROM (
+        SELECT method, status, refunded FROM payments
+        UNION ALL
+        SELECT method, status, refunded FROM payments_archive
+    ) AS all_payments
+    GROUP BY method
+"""
+
+
+def record_charges(cursor, outcomes):
+    """Count new payments given as `(method, status)`; call inside the transaction that inserted them."""
+    totals = {}
+    for method, status in outcomes:
+        payments, failed = totals.get(method, (0, 0))
+        totals[method] = (payments + 1, failed + (1 if status == 0 else 0))
+    if totals:
+        cursor.executemany(
+            """INSERT INTO payment_counters (method, payments_total, failed_total) VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE payments_total = payments_total + VALUES(payments_total),
+                                       failed_total = failed_total + VALUES(failed_total)""",
+            [(method, payments, failed) for method, (payments, failed) in sorted(totals.items())]
+        )
+
+
+def record_refund(cursor, method, count=1):
+    """Count refunds; call inside the transaction that flipped `refunded`.
+
+    Upserts like `record_charges`, so a method without a counter row yet (e.g.
+    an upgraded database whose counters were never rebuilt) still counts it.
+    """
+    cursor.execute(
+        """INSERT INTO payment_counters (method, refunded_total) VALUES (%s, %s)
+           ON DUPLICATE KEY UPDATE refunded_total = refunded_total + VALUES(refunded_total)""",
+        (method, count)
+    )
+
+
+def rebuild(conn):
+    """Recompute every counter from `payments` and `payments_archive` in one transaction."""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM payment_counters")
+    cursor.execute(REBUILD_SQL)
+    conn.commit()
+    cursor.close()
+
+
+def read(conn):
+    """Return `{method: {"payments": n, "failed": n, "refunded": n}}`."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT method, payments_total, failed_total, refunded_total FROM payment_counters")
+    totals = {
+        method: {"payments": int(payments), "failed": int(failed), "refunded": int(refunded)}
+        for method, payments, failed, refunded in cursor.fetchall()
+    }
+    cursor.close()
+    return totals
+
+
+def main():
+    from .db import get_connection
+
+    conn = get_connection()
+    try:
+        rebuild(conn)
+    finally:
+        conn.close()
+    print("✅ Rebuilt payment counters.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,81 @@
 from .db import get_connection
-import random
-import secrets
+from . import archive, counters, idempotency, rollups
+from .references import new_reference
+from .simulation import simulator, wait
+from .config import settings
+import base64
+import json
 from datetime import datetime
 
 
+# Columns added after the original schema; added to older tables by `python -m app.migrate`
+PAYMENT_EXTRA_COLUMNS = {
+    "refunded_at": "TIMESTAMP(6) NULL",
+}
+
+# Exactly the PaymentOut fields, so listing rows can be serialized as-is
+PAYMENT_COLUMNS = "payment_id, order_id, amount, method, status, reference, created_at, refunded"
+
+
+# Composite indexes behind the listing filters; the trailing (created_at, payment_id)
+# serves both the ORDER BY and the keyset position
+PAYMENT_INDEXES = {
+    "idx_payments_created": ("created_at", "payment_id"),
+    "idx_payments_order_created": ("order_id", "created_at", "payment_id"),
+    "idx_payments_method_status_created": ("method", "status", "created_at", "payment_id"),
+    "idx_payments_status_created": ("status", "created_at", "payment_id"),
+    # rollup backfill of refunds by refund time
+    "idx_payments_refunded_at": ("refunded_at",),
+}
+
+
+def _encode_cursor(sort_by_created, row):
+    """Build an opaque keyset cursor pointing just after `row`."""
+    payload = json.dumps(
+        {"s": sort_by_created, "k": [row["created_at"].isoformat(sep=" "), row["payment_id"]]},
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(sort_by_created, cursor):
+    """Decode a cursor produced by `_encode_cursor` for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_key, key = payload["s"], payload["k"]
+        created_at, payment_id = str(key[0]), int(key[1])
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if sort_key != sort_by_created:
+        raise ValueError("Cursor does not match the requested sort order")
+    return created_at, payment_id
+
+
+def normalize_payment(row):
+    """Convert DB types to the PaymentOut ones (DECIMAL -> float, TINYINT -> bool) in place."""
+    row["amount"] = float(row["amount"]) if row["amount"] is not None else None
+    row["status"] = bool(row["status"])
+    row["refunded"] = bool(row["refunded"])
+    return row
+
+
+def _reaches_archive(start_date):
+    """True when a listing starting at `start_date` may match archived payments.
+
+    Without a start date any payment may match, so both tiers are read; only a
+    range starting after the archive cutoff stays on the hot tier.
+    """
+    if not start_date:
+        return True
+    try:
+        start = datetime.fromisoformat(str(start_date).strip())
+    except ValueError:
+        # Let MySQL interpret unusual formats and search both tiers
+        return True
+    return start < archive.cutoff(settings.PAYMENT_ARCHIVE_AFTER_DAYS)
+
+
 def fetch_payments(
     page=1,
     per_page=10,
@@ -15,27 +87,35 @@ def fetch_payments(
     start_date=None,
     end_date=None,
     sort_by_created: str = "desc",
-    refunded: bool = None
+    refunded: bool = None,
+    cursor=None,
+    include_total=True,
+    include_archive=False
 ):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    """Return `(rows, total, next_cursor)` for one page of payments, newest first by default.
 
-    query = "SELECT * FROM payments WHERE 1=1"
-    count_query = "SELECT COUNT(*) as total FROM payments WHERE 1=1"
+    With `cursor` set the page is resolved by keyset on `(created_at,
+    payment_id)` and `page` is ignored, so deep pages cost the same as the
+    first one. `total` is None when `include_total` is False.
+
+    Both tiers are merged unless `start_date` is after the archive cutoff, in
+    which case only the hot `payments` table is read (`include_archive` forces
+    both tiers regardless).
+    """
+    sort_by_created = "asc" if sort_by_created.lower() == "asc" else "desc"
+    key = _decode_cursor(sort_by_created, cursor) if cursor else None
+    tiers = archive.TIERS if include_archive or _reaches_archive(start_date) else archive.TIERS[:1]
+
+    filters = "1=1"
     params = []
-    count_params = []
 
     if order_id is not None:
-        query += " AND order_id = %s"
-        count_query += " AND order_id = %s"
+        filters += " AND order_id = %s"
         params.append(order_id)
-        count_params.append(order_id)
 
     if method:
-        query += " AND method = %s"
-        count_query += " AND method = %s"
+        filters += " AND method = %s"
         params.append(method)
-        count_params.append(method)
 
     if status is not None:
         # accept textual status values (SUCCESS/FAILED/1/0/true/false)
@@ -44,128 +124,332 @@ def fetch_payments(
             status_val = 1
         else:
             status_val = 0
-        query += " AND status = %s"
-        count_query += " AND status = %s"
+        filters += " AND status = %s"
         params.append(status_val)
-        count_params.append(status_val)
 
     if amount_gt is not None:
-        query += " AND amount >= %s"
-        count_query += " AND amount >= %s"
+        filters += " AND amount >= %s"
         params.append(amount_gt)
-        count_params.append(amount_gt)
 
     if amount_lt is not None:
-        query += " AND amount <= %s"
-        count_query += " AND amount <= %s"
+        filters += " AND amount <= %s"
         params.append(amount_lt)
-        count_params.append(amount_lt)
 
     if start_date:
-        query += " AND created_at >= %s"
-        count_query += " AND created_at >= %s"
+        filters += " AND created_at >= %s"
         params.append(start_date)
-        count_params.append(start_date)
 
     if end_date:
-        query += " AND created_at <= %s"
-        count_query += " AND created_at <= %s"
+        filters += " AND created_at <= %s"
         params.append(end_date)
-        count_params.append(end_date)
-    
+
     if refunded is not None:
-        query += " AND refunded = %s"
-        count_query += " AND refunded = %s"
+        filters += " AND refunded = %s"
         params.append(1 if refunded else 0)
-        count_params.append(1 if refunded else 0)
 
-    # sorting
-    order_clause = "DESC" if sort_by_created.lower() != "asc" else "ASC"
-    query += f" ORDER BY created_at {order_clause}"
+    count_filters, count_params = filters, list(params)
+
+    # keyset position
+    if key:
+        comparison = ">" if sort_by_created == "asc" else "<"
+        filters += f" AND (created_at, payment_id) {comparison} (%s, %s)"
+        params.extend(key)
 
-    # pagination
-    query += " LIMIT %s OFFSET %s"
-    params.extend([per_page, (page - 1) * per_page])
+    # sorting; payment_id breaks created_at ties so keyset positions are unique
+    order_clause = sort_by_created.upper()
+    order_by = f" ORDER BY created_at {order_clause}, payment_id {order_clause}"
+    offset = 0 if key else (page - 1) * per_page
 
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
+    if len(tiers) == 1:
+        query = f"SELECT {PAYMENT_COLUMNS} FROM payments WHERE {filters}{order_by} LIMIT %s OFFSET %s"
+        query_params = params + [per_page, offset]
+        count_query = f"SELECT COUNT(*) AS total FROM payments WHERE {count_filters}"
+    else:
+        # Each tier contributes at most offset + per_page rows in order; merge and cut the page
+        branch = f"(SELECT {PAYMENT_COLUMNS} FROM {{table}} WHERE {filters}{order_by} LIMIT %s)"
+        query = " UNION ALL ".join(branch.format(table=table) for table in tiers)
+        query += f"{order_by} LIMIT %s OFFSET %s"
+        query_params = (params + [offset + per_page]) * len(tiers) + [per_page, offset]
+        count_query = "SELECT " + " + ".join(
+            f"(SELECT COUNT(*) FROM {table} WHERE {count_filters})" for table in tiers
+        ) + " AS total"
+        count_params = count_params * len(tiers)
 
-    cursor.execute(count_query, count_params)
-    total = cursor.fetchone()["total"]
+    conn = get_connection()
+    db_cursor = conn.cursor(dictionary=True)
+    db_cursor.execute(query, query_params)
+    rows = db_cursor.fetchall()
+
+    total = None
+    if include_total:
+        db_cursor.execute(count_query, count_params)
+        total = int(db_cursor.fetchone()["total"])
 
     conn.close()
-    return rows, total
 
+    next_cursor = _encode_cursor(sort_by_created, rows[-1]) if len(rows) == per_page else None
+    return [normalize_payment(row) for row in rows], total, next_cursor
 
-def create_payment_probabilistic(order_id: int, amount: float):
-    """Create a payment row with probabilistic/random method and status.
 
-    Returns the inserted payment row (dictionary) including payment_id and reference.
+def order_payment_status(payments):
+    """Summarize an order's payments in the order service's terms.
+
+    PENDING without payments, PAID while a successful payment is not refunded,
+    REFUNDED once every successful payment is, FAILED if none succeeded.
     """
+    if not payments:
+        return "PENDING"
+    successful = [p for p in payments if p["status"]]
+    if not successful:
+        return "FAILED"
+    if all(p["refunded"] for p in successful):
+        return "REFUNDED"
+    return "PAID"
+
+
+def fetch_order_payments(order_ids):
+    """Return `{order_id: [payments]}` for every id in `order_ids`, oldest payment first.
+
+    One round trip: an `order_id IN (...)` lookup on the
+    `(order_id, created_at, payment_id)` index of each tier, merged with
+    UNION ALL. Orders without payments map to an empty list.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    result = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return result
+
+    placeholders = ", ".join(["%s"] * len(order_ids))
+    query = " UNION ALL ".join(
+        f"SELECT {PAYMENT_COLUMNS} FROM {table} WHERE order_id IN ({placeholders})" for table in archive.TIERS
+    ) + " ORDER BY order_id, created_at, payment_id"
+
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, order_ids * len(archive.TIERS))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
 
-    method = random.choice(["COD", "CARD", "UPI"])
-    # probabilistic boolean status stored as 1 (success) or 0 (failed)
-    status_bool = 1 if random.random() < 0.6 else 0
-    # random reference suffix
-    suffix = secrets.token_hex(4).upper()
-    reference = f"ECI20250910-{suffix}"
-    created_at = datetime.now()
+    for row in rows:
+        result[row["order_id"]].append(normalize_payment(row))
+    return result
 
-    cursor.execute(
-        """INSERT INTO payments 
+
+INSERT_PAYMENT_SQL = """INSERT INTO payments 
            (order_id, amount, method, status, reference, created_at, refunded) 
-           VALUES (%s,%s,%s,%s,%s,%s,%s)""",
-        (order_id, amount, method, status_bool, reference, created_at, 0)
-    )
-    conn.commit()
-    payment_id = cursor.lastrowid
+           VALUES (%s,%s,%s,%s,%s,%s,%s)"""
 
-    # fetch the inserted row
-    cursor.execute("SELECT * FROM payments WHERE payment_id=%s", (payment_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return row
+
+def create_payment_probabilistic(order_id: int, amount: float, idempotency_key: str = None):
+    """Create a payment row with the method and status drawn by the payment simulator.
+
+    Returns the inserted payment row (dictionary) including payment_id and reference.
+    With `idempotency_key`, a repeat of an earlier request returns that
+    request's `{payment_id, reference, status}` with `replayed=True` instead
+    (IdempotencyConflict if the key came with a different order/amount).
+    """
+    expected_hash = None
+    if idempotency_key:
+        expected_hash = idempotency.request_hash(order_id, amount)
+        outcome = idempotency.cached_response(idempotency_key, expected_hash)
+        if outcome is not None:
+            return {**outcome, "replayed": True}
+
+    # Simulated gateway call before checkout, as in create_payments_batch, so the
+    # delay holds neither a pool connection nor the idempotency key's lock. A
+    # duplicate that turns out to be a replay discards its draw.
+    drawn, latency = simulator.draw()
+    method, status_bool, reference = drawn.method, drawn.status, new_reference()
+    wait(latency)
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if idempotency_key:
+            outcome = idempotency.claim(cursor, idempotency_key, expected_hash)
+            if outcome is not None:
+                conn.rollback()
+                return {**outcome, "replayed": True}
+
+        # whole seconds, as stored in `payments.created_at`, so the rollup bucket matches the row
+        created_at = datetime.now().replace(microsecond=0)
+
+        cursor.execute(
+            INSERT_PAYMENT_SQL,
+            (order_id, amount, method, status_bool, reference, created_at, 0)
+        )
+        payment_id = cursor.lastrowid
+        counters.record_charges(cursor, [(method, status_bool)])
+        rollups.record_charges(cursor, [(created_at, method, status_bool, amount)])
+        outcome = {"payment_id": payment_id, "reference": reference, "status": status_bool}
+        if idempotency_key:
+            idempotency.complete(cursor, idempotency_key, outcome)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    if idempotency_key:
+        idempotency.remember(idempotency_key, expected_hash, outcome)
+    return {
+        "payment_id": payment_id, "order_id": order_id, "amount": amount, "method": method,
+        "status": status_bool, "reference": reference, "created_at": created_at, "refunded": 0,
+    }
+
+
+def create_payments_batch(charges):
+    """Charge many orders at once; `charges` is a list of `(order_id, amount)`.
+
+    Every payment gets its own simulator draw, like `create_payment_probabilistic`,
+    with one simulated gateway delay for the batch, taken before a connection is
+    checked out. All rows go in with one multi-row INSERT (executemany rewrites
+    it), with the counters and rollups in the same transaction.
+    Returns one `{order_id, reference, status}` dict per charge, in order.
+    """
+    drawn, latency = simulator.draw_many(len(charges))
+    wait(latency)
+    created_at = datetime.now().replace(microsecond=0)
+    rows = []
+    results = []
+    for (order_id, amount), outcome in zip(charges, drawn):
+        reference = new_reference()
+        rows.append((order_id, amount, outcome.method, outcome.status, reference, created_at, 0))
+        results.append({"order_id": order_id, "reference": reference, "status": outcome.status})
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(INSERT_PAYMENT_SQL, rows)
+        counters.record_charges(cursor, [(row[2], row[3]) for row in rows])
+        rollups.record_charges(cursor, [(row[5], row[2], row[3], row[1]) for row in rows])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return results
 
 
 def fetch_payment_by_id(payment_id: int):
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM payments WHERE payment_id=%s", (payment_id,))
-    row = cursor.fetchone()
+    row = None
+    for table in archive.TIERS:
+        cursor.execute(f"SELECT * FROM {table} WHERE payment_id=%s", (payment_id,))
+        row = cursor.fetchone()
+        if row:
+            break
     conn.close()
     return row
 
 
 def refund_payment(payment_id: int):
     """Idempotent refund: if payment.status == 'SUCCESS' -> set 'REFUNDED' and return amount/method.
-    If already 'REFUNDED', return same amount/method (idempotent). If payment failed, return None.
+    If already 'REFUNDED', return same amount/method (idempotent). If payment failed, return False;
+    if it does not exist, return None.
+
+    The refund itself is one conditional UPDATE and its affected-row count
+    decides the outcome, so concurrent refunds of the same payment cannot both
+    succeed. The follow-up read on the same connection fetches the amount/method
+    of a payment refunded by this call, or tells a missing payment from a failed
+    or already refunded one. Payments not in the hot table are looked up and
+    refunded in the archive.
     """
+    refunded_at = datetime.now()
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT payment_id, amount, method, status FROM payments WHERE payment_id=%s", (payment_id,))
-    row = cursor.fetchone()
-    if not row:
+    try:
+        # Hot tier first: a payment archived while we waited for its lock is then found in the archive
+        for table in archive.TIERS:
+            cursor.execute(
+                f"UPDATE {table} SET refunded=1, refunded_at=%s WHERE payment_id=%s AND status=1 AND refunded=0",
+                (refunded_at, payment_id)
+            )
+            refunded_now = cursor.rowcount == 1
+            cursor.execute(f"SELECT amount, method, status FROM {table} WHERE payment_id=%s", (payment_id,))
+            row = cursor.fetchone()
+            if row:
+                break
+        if refunded_now:
+            counters.record_refund(cursor, row["method"])
+            rollups.record_refunds(cursor, [(refunded_at, row["method"], row["amount"])])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
         conn.close()
+
+    if not row:
         return None
+    # payment failed -> cannot refund; otherwise refunded now or by an earlier call
+    if not refunded_now and not row["status"]:
+        return False
+    return {"payment_id": payment_id, "amount": row["amount"], "method": row["method"]}
 
-    status = row.get("status")
-    refunded = row.get("refunded")
-    # If already refunded, return idempotent result
-    if refunded:
-        result = {"payment_id": payment_id, "amount": row["amount"], "method": row["method"]}
-        conn.close()
-        return result
 
-    # Only allow refund when original status indicates success (1)
-    if status == 1:
-        cursor.execute("UPDATE payments SET refunded=%s WHERE payment_id=%s", (1, payment_id))
+def refund_order_payments(order_id: int):
+    """Refund every successful, not yet refunded payment of an order in one UPDATE per tier.
+
+    Returns `(refunded, summary)`: the `{payment_id, amount, method}` rows
+    refunded by this call, and, only when there were none, a
+    `{total, successful}` count of the order's payments so the caller can
+    tell "nothing to refund" from "already refunded".
+    """
+    refunded_at = datetime.now()
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    summary = None
+    refunded = []
+    try:
+        for table in archive.TIERS:
+            # Lock the candidates first: a concurrent refund of the same order waits
+            # here and then finds them refunded, so exactly these rows are ours
+            cursor.execute(
+                f"SELECT payment_id, amount, method FROM {table}"
+                " WHERE order_id=%s AND status=1 AND refunded=0 ORDER BY payment_id FOR UPDATE",
+                (order_id,)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                continue
+            placeholders = ", ".join(["%s"] * len(rows))
+            cursor.execute(
+                f"UPDATE {table} SET refunded=1, refunded_at=%s WHERE payment_id IN ({placeholders})",
+                (refunded_at, *(row["payment_id"] for row in rows))
+            )
+            refunded.extend(rows)
+        if refunded:
+            per_method = {}
+            for row in refunded:
+                per_method[row["method"]] = per_method.get(row["method"], 0) + 1
+            for method, count in sorted(per_method.items()):
+                counters.record_refund(cursor, method, count)
+            rollups.record_refunds(cursor, [(refunded_at, row["method"], row["amount"]) for row in refunded])
+        else:
+            summary = {"total": 0, "successful": 0}
+            for table in archive.TIERS:
+                cursor.execute(
+                    "SELECT COUNT(*) AS total, COALESCE(SUM(status = 1), 0) AS successful"
+                    f" FROM {table} WHERE order_id=%s",
+                    (order_id,)
+                )
+                for key, value in cursor.fetchone().items():
+                    summary[key] += int(value)
         conn.commit()
-        result = {"payment_id": payment_id, "amount": row["amount"], "method": row["method"]}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
         conn.close()
-        return result
-
-    # payment failed -> cannot refund
-    conn.close()
-    return False
+    return refunded, summary
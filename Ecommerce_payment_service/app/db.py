@@ -14,3 +14,67 @@ connection_pool = pooling.MySQLConnectionPool(
 
 def get_connection():
     return connection_pool.get_connection()
+
+def connect():
+    """Open a dedicated connection outside the pool, for long streaming reads."""
+    return mysql.connector.connect(
+        host=settings.MYSQL_HOST,
+        database=settings.MYSQL_DB,
+        user=settings.MYSQL_USER,
+        password=settings.MYSQL_PASSWORD
+    )
+
+def ensure_tables(*ddl_statements):
+    """Create the auxiliary tables this service owns if they are missing."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    for ddl in ddl_statements:
+        cursor.execute(ddl)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def ensure_indexes(table, indexes):
+    """Add any of `indexes` ({name: columns}) missing from `table` in one online ALTER.
+
+    Slow on a large table; run from `python -m app.migrate`, never at startup.
+    Returns the clauses applied.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS"
+        " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+    )
+    existing = {name for (name,) in cursor.fetchall()}
+    missing = [
+        f"ADD INDEX {name} ({', '.join(columns)})"
+        for name, columns in indexes.items() if name not in existing
+    ]
+    if missing:
+        cursor.execute(f"ALTER TABLE {table} {', '.join(missing)}, LOCK=NONE")
+    cursor.close()
+    conn.close()
+    return missing
+
+def ensure_columns(table, columns):
+    """Add any of `columns` ({name: definition}) missing from `table` in one online ALTER.
+
+    Run from `python -m app.migrate`, never at startup. Returns the clauses applied.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS"
+        " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+    )
+    existing = {name for (name,) in cursor.fetchall()}
+    missing = [
+        f"ADD COLUMN {name} {definition}"
+        for name, definition in columns.items() if name not in existing
+    ]
+    if missing:
+        cursor.execute(f"ALTER TABLE {table} {', '.join(missing)}, LOCK=NONE")
+    cursor.close()
+    conn.close()
+    return missing
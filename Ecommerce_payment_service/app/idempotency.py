@@ -0,0 +1,191 @@
+"""
+Idempotency keys for payment charges.
+
+A charge sent with an `Idempotency-Key` header first inserts the key into
+`payment_idempotency_keys`, in the same transaction as the payment, and
+stores the outcome on the key row before committing. A concurrent duplicate
+blocks on that row's lock until the first transaction finishes. If it
+committed, the duplicate gets a duplicate-key error and replays the stored
+outcome; if it rolled back, the duplicate claims the key itself (several
+waiting duplicates may then deadlock, and the victims retry). Keys expire
+after IDEMPOTENCY_TTL_SECONDS. Completed outcomes are also kept in an
+in-process hot cache, so a retry normally never reaches MySQL.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from mysql.connector import errorcode, errors
+
+from .config import settings
+from .db import get_connection
+
+DDL = """
+CREATE TABLE IF NOT EXISTS payment_idempotency_keys (
+    idempotency_key VARCHAR(255) PRIMARY KEY,
+    request_hash CHAR(64) NOT NULL,
+    response TEXT NULL,
+    created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    expires_at TIMESTAMP(6) NOT NULL,
+    INDEX idx_payment_idempotency_keys_expires (expires_at)
+);
+"""
+
+
+
+class _HotCache:
+    """Outcomes of recently completed keys, at most IDEMPOTENCY_CACHE_MAX_ENTRIES
+    (oldest dropped first), each kept no longer than the key itself."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            expires_at, value = self._entries.get(key, (0, None))
+            if expires_at <= time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        ttl = min(ttl, self.ttl)
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+hot_cache = _HotCache(settings.IDEMPOTENCY_CACHE_MAX_ENTRIES, settings.IDEMPOTENCY_CACHE_TTL_SECONDS)
+
+
+CLAIM_DEADLOCK_RETRIES = 3
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used with a different request body."""
+
+
+def request_hash(order_id, amount):
+    canonical = json.dumps({"order_id": order_id, "amount": round(float(amount), 2)}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _check(key, stored_hash, expected_hash):
+    if stored_hash != expected_hash:
+        raise IdempotencyConflict(f"Idempotency-Key '{key}' was already used with a different request")
+
+
+def cached_response(key, expected_hash):
+    """Return the outcome stored for `key` from the hot cache, or None."""
+    entry = hot_cache.get(key)
+    if entry is None:
+        return None
+    _check(key, entry["request_hash"], expected_hash)
+    return entry["response"]
+
+
+def claim(cursor, key, expected_hash):
+    """Claim `key` inside the caller's transaction (`cursor` is a dictionary cursor).
+
+    Returns None when the key is now ours (the caller creates the payment and
+    calls `complete()` before committing), or the stored outcome of the
+    earlier request with the same key. Must be the first statement of the
+    transaction: a deadlock between duplicates is retried from scratch.
+    """
+    deadlocks = 0
+    while True:
+        try:
+            cursor.execute(
+                "INSERT INTO payment_idempotency_keys (idempotency_key, request_hash, expires_at)"
+                " VALUES (%s, %s, NOW(6) + INTERVAL %s SECOND)",
+                (key, expected_hash, settings.IDEMPOTENCY_TTL_SECONDS)
+            )
+            return None
+        except errors.IntegrityError as e:
+            if e.errno != errorcode.ER_DUP_ENTRY:
+                raise
+        except errors.DatabaseError as e:
+            # Duplicates queued behind a claim that rolled back all upgrade their shared
+            # locks at once and InnoDB kills all but one. The victim's transaction is
+            # rolled back, and the claim is its first statement, so it can start over.
+            if e.errno != errorcode.ER_LOCK_DEADLOCK or deadlocks >= CLAIM_DEADLOCK_RETRIES:
+                raise
+            deadlocks += 1
+            continue
+
+        # Locking read: sees the latest committed row, not this transaction's snapshot
+        cursor.execute(
+            "SELECT request_hash, response, expires_at <= NOW(6) AS expired,"
+            " TIMESTAMPDIFF(SECOND, NOW(6), expires_at) AS ttl"
+            " FROM payment_idempotency_keys WHERE idempotency_key = %s LOCK IN SHARE MODE",
+            (key,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            # Purged between our INSERT and SELECT; try to claim it again
+            continue
+        if row["expired"]:
+            cursor.execute(
+                "DELETE FROM payment_idempotency_keys WHERE idempotency_key = %s AND expires_at <= NOW(6)", (key,)
+            )
+            continue
+        _check(key, row["request_hash"], expected_hash)
+        outcome = json.loads(row["response"])
+        hot_cache.set(key, {"request_hash": row["request_hash"], "response": outcome}, ttl=row["ttl"])
+        return outcome
+
+
+def complete(cursor, key, outcome):
+    """Store the outcome on the claimed key; call before committing the payment."""
+    cursor.execute(
+        "UPDATE payment_idempotency_keys SET response = %s WHERE idempotency_key = %s",
+        (json.dumps(outcome), key)
+    )
+
+
+def remember(key, expected_hash, outcome):
+    """Put a committed outcome in the hot cache."""
+    hot_cache.set(key, {"request_hash": expected_hash, "response": outcome}, ttl=settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+def purge_expired(batch_size=1000):
+    """Delete up to `batch_size` expired keys; returns the number removed."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM payment_idempotency_keys WHERE expires_at <= NOW(6) ORDER BY expires_at LIMIT %s",
+            (batch_size,)
+        )
+        purged = cursor.rowcount
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    return purged
+
+
+def run_purger(stop_event):
+    """Background loop removing expired keys every IDEMPOTENCY_PURGE_INTERVAL_SECONDS."""
+    while not stop_event.wait(settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS):
+        try:
+            while purge_expired() >= 1000:
+                time.sleep(0.1)
+        except Exception as e:
+            print(f"[Idempotency] purge failed: {e}")
+
+
+def start_purger():
+    stop_event = threading.Event()
+    threading.Thread(target=run_purger, args=(stop_event,), name="idempotency-purger", daemon=True).start()
+    return stop_event
@@ -1,9 +1,10 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional
-from . import crud, schemas
-from datetime import datetime
-from fastapi.responses import Response
+from . import archive, counters, crud, db, idempotency, metrics, rollups, schemas, settlement, simulation
+from .config import settings
+from datetime import date, datetime
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 app = FastAPI(title="Payments Service", version="1.0.0")
 
@@ -17,19 +18,76 @@ app.add_middleware(
 )
 
 
-@app.post("/v1/payments/charge", status_code=201)
-def charge_payment(payload: schemas.PaymentCharge):
-    """Create a payment record probabilistically and return reference + status message."""
-    row = crud.create_payment_probabilistic(payload.order_id, payload.amount)
-    if not row:
-        raise HTTPException(status_code=500, detail="Failed to create payment")
+@app.on_event("startup")
+def startup_event():
+    db.ensure_tables(archive.DDL, counters.DDL, idempotency.DDL, *rollups.DDL)
+    app.state.idempotency_purger = idempotency.start_purger()
+
 
-    ref = row.get("reference")
-    status_val = row.get("status")
+@app.on_event("shutdown")
+def shutdown_event():
+    app.state.idempotency_purger.set()
+
+
+def _charge_outcome(reference, status_val):
     # convert DB boolean status to human readable
     status = "SUCCESS" if status_val == 1 else "FAILED"
     msg = "Payment succeeded" if status_val == 1 else "Payment failed"
-    return {"reference": ref, "status": status, "message": msg}
+    return {"reference": reference, "status": status, "message": msg}
+
+
+@app.post("/v1/payments/charge", status_code=201)
+def charge_payment(
+    payload: schemas.PaymentCharge,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Create a payment record probabilistically and return reference + status message.
+
+    Retries carrying the same `Idempotency-Key` header get the original
+    outcome back (flagged with `Idempotent-Replayed: true`) instead of a
+    second payment; reusing a key for a different order/amount is a 422.
+    """
+    with metrics.charge_latency.time():
+        try:
+            row = crud.create_payment_probabilistic(payload.order_id, payload.amount, idempotency_key=idempotency_key)
+        except idempotency.IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    if not row:
+        raise HTTPException(status_code=500, detail="Failed to create payment")
+
+    if row.get("replayed"):
+        response.headers["Idempotent-Replayed"] = "true"
+    return _charge_outcome(row.get("reference"), row.get("status"))
+
+
+@app.post("/v1/payments/charge/batch", response_model=schemas.PaymentChargeBatchResult, status_code=201)
+def charge_payments_batch(payload: schemas.PaymentChargeBatch):
+    """Charge up to PAYMENT_BATCH_MAX_ITEMS orders in one transaction.
+
+    Each order gets the same independent outcome as a single charge; results
+    are returned in request order.
+    """
+    with metrics.batch_charge_latency.time():
+        rows = crud.create_payments_batch([(c.order_id, c.amount) for c in payload.charges])
+
+    results = [{"order_id": row["order_id"], **_charge_outcome(row["reference"], row["status"])} for row in rows]
+    succeeded = sum(1 for row in rows if row["status"] == 1)
+    return {"succeeded": succeeded, "failed": len(rows) - succeeded, "results": results}
+
+
+@app.post("/v1/payments/simulation/reset", response_model=schemas.SimulationState)
+def reset_simulation(payload: Optional[schemas.SimulationReset] = None):
+    """Restart the simulated outcome sequence, optionally with a new seed.
+
+    Lets benchmark runs replay the same charge outcomes against a running
+    service. Only available with PAYMENT_SIM_RESET_ENABLED.
+    """
+    if not settings.PAYMENT_SIM_RESET_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    seed = payload.seed if payload and payload.seed is not None else settings.PAYMENT_SIM_SEED
+    simulation.simulator.reset(seed)
+    return simulation.simulator.state()
 
 
 @app.post("/v1/payments/{payment_id}/refund", response_model=schemas.RefundResponse)
@@ -39,11 +97,8 @@ def refund_payment(payment_id: int):
     If payment was SUCCESS, mark REFUNDED and return amount/method. If already REFUNDED, return same.
     If payment failed or not found, raise 400/404 accordingly.
     """
-    payment = crud.fetch_payment_by_id(payment_id)
-    if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found")
-
-    result = crud.refund_payment(payment_id)
+    with metrics.refund_latency.time():
+        result = crud.refund_payment(payment_id)
     if result is None:
         raise HTTPException(status_code=404, detail="Payment not found")
     if result is False:
@@ -52,6 +107,79 @@ def refund_payment(payment_id: int):
     return {"payment_id": result["payment_id"], "amount": float(result["amount"]), "method": result["method"], "message": f"Amount {result['amount']} refunded to {result['method']}"}
 
 
+def _order_payments_body(order_id, payments):
+    return {"order_id": order_id, "payment_status": crud.order_payment_status(payments), "payments": payments}
+
+
+@app.get("/v1/orders/payments", response_model=schemas.OrderPaymentsBatch)
+def list_orders_payments(order_ids: str = Query(..., description="Comma-separated order ids")):
+    """Payments of many orders (hot and archived) in one indexed query.
+
+    Orders come back in request order with their payments oldest first and a
+    `payment_status` summary (PENDING/PAID/REFUNDED/FAILED); orders without
+    payments are included as PENDING.
+    """
+    try:
+        ids = [int(part) for part in order_ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="order_ids must be comma-separated integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="order_ids is empty")
+    if len(set(ids)) > settings.ORDER_PAYMENTS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.ORDER_PAYMENTS_MAX_IDS} order_ids per request")
+
+    by_order = crud.fetch_order_payments(ids)
+    body = {"orders": [_order_payments_body(order_id, payments) for order_id, payments in by_order.items()]}
+    if settings.FAST_JSON_RESPONSES:
+        return ORJSONResponse(body)
+    return body
+
+
+@app.get("/v1/orders/{order_id}/payments", response_model=schemas.OrderPayments)
+def list_order_payments(order_id: int):
+    """All payments of one order (hot and archived), oldest first, with a `payment_status` summary."""
+    payments = crud.fetch_order_payments([order_id])[order_id]
+    return _order_payments_body(order_id, payments)
+
+
+@app.post("/v1/orders/{order_id}/payments/refund", response_model=schemas.OrderRefundResponse)
+def refund_order_payments(order_id: int):
+    """Refund all successful payments of an order (idempotent).
+
+    Each tier (hot, then archive) locks the order's refundable payments with
+    `SELECT ... FOR UPDATE` and flips exactly those rows with one `UPDATE`, all
+    in one transaction.
+
+    Repeating the call after everything was refunded returns 200 with
+    `refunded_count` 0; an order without payments is a 404, and one whose
+    payments all failed is a 400.
+    """
+    with metrics.refund_latency.time():
+        refunded, summary = crud.refund_order_payments(order_id)
+
+    if not refunded:
+        if summary["total"] == 0:
+            raise HTTPException(status_code=404, detail="No payments found for order")
+        if summary["successful"] == 0:
+            raise HTTPException(status_code=400, detail="Order has no successful payment to refund")
+
+    amount = sum(row["amount"] for row in refunded)
+    message = (
+        f"Amount {amount} refunded for order {order_id} across {len(refunded)} payment(s)"
+        if refunded else f"Payments for order {order_id} were already refunded"
+    )
+    return {
+        "order_id": order_id,
+        "refunded_count": len(refunded),
+        "amount": float(amount),
+        "payments": [
+            {"payment_id": row["payment_id"], "amount": float(row["amount"]), "method": row["method"]}
+            for row in refunded
+        ],
+        "message": message,
+    }
+
+
 @app.get("/v1/payments", response_model=schemas.PaginatedPayments)
 def list_payments(
     page: int = Query(1, ge=1),
@@ -63,28 +191,93 @@ def list_payments(
     amount_lt: Optional[float] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    sort_by_created: Optional[str] = Query("desc", regex="^(asc|desc)$")
+    sort_by_created: Optional[str] = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    include_archive: bool = False
 ):
     # pass through filters to crud
-    items, total = crud.fetch_payments(page=page, per_page=per_page, order_id=order_id, method=method, status=status, amount_gt=amount_gt, amount_lt=amount_lt, start_date=start_date, end_date=end_date, sort_by_created=sort_by_created)
-    return {"items": items, "page": page, "per_page": per_page, "total": total}
+    try:
+        items, total, next_cursor = crud.fetch_payments(page=page, per_page=per_page, order_id=order_id, method=method, status=status, amount_gt=amount_gt, amount_lt=amount_lt, start_date=start_date, end_date=end_date, sort_by_created=sort_by_created, cursor=cursor, include_total=include_total, include_archive=include_archive)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = {"items": items, "page": page, "per_page": per_page, "total": total, "next_cursor": next_cursor}
+    if settings.FAST_JSON_RESPONSES:
+        # Rows are normalized by crud.fetch_payments; skip response_model re-validation
+        return ORJSONResponse(body)
+    return body
+
+
+@app.get("/v1/payments/rollups", response_model=schemas.PaymentRollups)
+def payment_rollups(
+    start: datetime,
+    end: datetime,
+    granularity: str = Query("day", regex="^(hour|day)$"),
+    method: Optional[str] = None
+):
+    """Pre-aggregated payment counts and sums per hour or day and method.
+
+    Returns the buckets overlapping `[start, end)` plus their totals, read from
+    the rollup tables maintained by the charge and refund paths.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if rollups.bucket_count(granularity, start, end) > settings.PAYMENT_ROLLUP_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans more than {settings.PAYMENT_ROLLUP_MAX_BUCKETS} {granularity} buckets"
+        )
+
+    conn = db.get_connection()
+    try:
+        items = rollups.read(conn, granularity, start, end, method=method)
+    finally:
+        conn.close()
+    totals = {field: sum(row[field] for row in items) for field in rollups.FIELDS}
+    body = {"granularity": granularity, "start": start, "end": end, "items": items, "totals": totals}
+    if settings.FAST_JSON_RESPONSES:
+        return ORJSONResponse(body)
+    return body
+
+
+@app.get("/v1/payments/settlement")
+def settlement_export(
+    day: date = Query(..., alias="date"),
+    format: str = Query("csv", regex="^(ndjson|csv)$")
+):
+    """Stream one day's settlement file as CSV or NDJSON.
+
+    Per method: the day's charges, then the day's refunds as negative
+    adjustments, then a subtotal; a grand total closes the file.
+    """
+    return StreamingResponse(
+        settlement.stream_settlement(format, day),
+        media_type=settlement.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="settlement-{day.isoformat()}.{format}"'},
+    )
 
 
 @app.get("/metrics")
-def metrics():
+def metrics_endpoint():
     """
     Prometheus-style metrics endpoint.
     Returns:
         - payments_failed_total
         - payments_refunded_total
         - payments_by_method{method="UPI"} etc.
+        - payment_charge_duration_seconds / payment_refund_duration_seconds histograms
+
+    Counts come from the `payment_counters` rows maintained by the charge and
+    refund paths, so a scrape costs the same whatever the size of `payments`.
     """
-    # 1️⃣ Fetch payments data for metrics using appropriate filters
-    failed_payments, failed_count = crud.fetch_payments(page=1, per_page=1_000_000, status="FAILED")
-    refunded_payments, refunded_count = crud.fetch_payments(page=1, per_page=1_000_000, refunded="True")
-    upi_payments, upi_count = crud.fetch_payments(page=1, per_page=1_000_000, method="UPI")
-    card_payments, card_count = crud.fetch_payments(page=1, per_page=1_000_000, method="CARD")
-    cod_payments, cod_count = crud.fetch_payments(page=1, per_page=1_000_000, method="COD")
+    # 1️⃣ Read the per-method counters
+    conn = db.get_connection()
+    try:
+        totals = counters.read(conn)
+    finally:
+        conn.close()
+    failed_count = sum(t["failed"] for t in totals.values())
+    refunded_count = sum(t["refunded"] for t in totals.values())
 
     # 2️⃣ Build Prometheus-style metrics output
     lines = []
@@ -98,10 +291,10 @@ def metrics():
 
     lines.append("# HELP payments_by_method_total Total number of payments per payment method")
     lines.append("# TYPE payments_by_method_total counter")
-    lines.append(f'payments_by_method_total{{method="UPI"}} {upi_count}')
-    lines.append(f'payments_by_method_total{{method="CARD"}} {card_count}')
-    lines.append(f'payments_by_method_total{{method="COD"}} {cod_count}')
+    for method in sorted(set(totals) | {"UPI", "CARD", "COD"}):
+        count = totals.get(method, {}).get("payments", 0)
+        lines.append(f'payments_by_method_total{{method="{method}"}} {count}')
 
     # 3️⃣ Return as text/plain
-    output = "\n".join(lines) + "\n"
+    output = "\n".join(lines) + "\n" + metrics.render()
     return Response(content=output, media_type="text/plain")
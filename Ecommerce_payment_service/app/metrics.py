@@ -0,0 +1,23 @@
+from prometheus_client import CollectorRegistry, Histogram, generate_latest
+
+# Per-process latency histograms, appended to the /metrics output
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+charge_latency = Histogram(
+    'payment_charge_duration_seconds', 'Time to process POST /v1/payments/charge',
+    buckets=LATENCY_BUCKETS, registry=registry
+)
+batch_charge_latency = Histogram(
+    'payment_batch_charge_duration_seconds', 'Time to process POST /v1/payments/charge/batch',
+    buckets=LATENCY_BUCKETS, registry=registry
+)
+refund_latency = Histogram(
+    'payment_refund_duration_seconds', 'Time to process POST /v1/payments/{payment_id}/refund',
+    buckets=LATENCY_BUCKETS, registry=registry
+)
+
+
+def render():
+    return generate_latest(registry).decode()
@@ -0,0 +1,30 @@
+"""
+Schema upgrades for an existing `payments` table.
+
+`ddl.sql` and `csv_loader.py` create `payments` with every column and
+index the service relies on, but `CREATE TABLE IF NOT EXISTS` leaves a table
+created by an older version as it was. Run this once per database after
+upgrading, before the new workers start:
+
+    python -m app.migrate
+
+Only what is missing is added, columns first since some indexes cover them,
+each step in an `ALTER TABLE ... LOCK=NONE`, so reads and writes carry on
+while InnoDB rebuilds the table and a rerun is a no-op.
+The service never alters `payments` itself.
+"""
+
+from . import crud, db
+
+
+def main():
+    changes = db.ensure_columns("payments", crud.PAYMENT_EXTRA_COLUMNS)
+    changes += db.ensure_indexes("payments", crud.PAYMENT_INDEXES)
+    for change in changes:
+        print(f"✅ {change}")
+    if not changes:
+        print("✅ 'payments' is up to date.")
+
+
+if __name__ == "__main__":
+    main()
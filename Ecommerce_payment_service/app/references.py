@@ -0,0 +1,80 @@
+"""
+Time-ordered payment references.
+
+A reference is `ECI-` followed by a ULID: a 48-bit millisecond timestamp and
+80 random bits, Crockford base32 encoded (26 characters). New references sort
+after older ones, so inserts append to the right edge of the `reference`
+UNIQUE index instead of landing on random pages.
+
+Within one process, references generated in the same millisecond increment
+the random part, so they stay unique and ordered even under a burst. Across
+worker processes each one starts from fresh random bits every millisecond;
+two processes would have to draw the same 80 bits in the same millisecond to
+collide. A forked worker reseeds itself instead of continuing its parent's
+sequence.
+"""
+
+import os
+import secrets
+import threading
+import time
+
+PREFIX = "ECI-"
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+
+def encode(timestamp_ms, randomness):
+    """Encode a 48-bit timestamp and 80 random bits as a 26-character ULID."""
+    value = (timestamp_ms << _RANDOM_BITS) | randomness
+    chars = []
+    for _ in range(26):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+class ReferenceGenerator:
+    """Thread-safe, per-process monotonic ULID source."""
+
+    def __init__(self, clock=None):
+        self._clock = clock or (lambda: time.time_ns() // 1_000_000)
+        self._reset()
+
+    def _reset(self):
+        # Also run in a forked child, where the parent's lock may be held by a thread that is gone
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_ulid(self):
+        with self._lock:
+            # Never go back in time, even if the wall clock does
+            now = max(self._clock(), self._last_ms)
+            if now == self._last_ms:
+                if self._last_random == _RANDOM_MAX:
+                    # 2^80 references in one millisecond: borrow the next one
+                    now += 1
+                    self._last_random = secrets.randbits(_RANDOM_BITS)
+                else:
+                    self._last_random += 1
+            else:
+                self._last_random = secrets.randbits(_RANDOM_BITS)
+            self._last_ms = now
+            return encode(now, self._last_random)
+
+    def new_reference(self):
+        return PREFIX + self.new_ulid()
+
+
+generator = ReferenceGenerator()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=generator._reset)
+
+
+def new_reference():
+    """Return a new unique, time-ordered payment reference."""
+    return generator.new_reference()
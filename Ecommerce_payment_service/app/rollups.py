@@ -0,0 +1,230 @@
+"""
+Hourly and daily payment rollups for range analytics.
+
+`payment_rollups_hourly` and `payment_rollups_daily` hold one row per
+(bucket_start, method) with charge counts/sums and refund counts/sums. The
+charge and refund paths bump them inside their own transaction, like
+`counters`, so `GET /v1/payments/rollups` reads a few hundred rows instead of
+summing raw payments. Charges land in the bucket of `created_at`, refunds in
+the bucket of `refunded_at` (`created_at` for rows refunded before that
+column existed).
+
+`backfill()` recomputes a range from `payments` and `payments_archive`, one
+day per transaction.
+Like `counters`, this module has no DB/pool imports so `csv_loader.py` can
+reuse it; `python -m app.rollups` runs a backfill against the app database.
+"""
+
+from datetime import datetime, timedelta
+
+TABLES = {
+    "hour": "payment_rollups_hourly",
+    "day": "payment_rollups_daily",
+}
+
+BUCKET_SIZES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# SQL bucket of a timestamp column, matching `_bucket()`
+BUCKET_SQL = {
+    "hour": "TIMESTAMP(DATE({col}), MAKETIME(HOUR({col}), 0, 0))",
+    "day": "TIMESTAMP(DATE({col}))",
+}
+
+DDL = tuple(
+    f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    bucket_start DATETIME NOT NULL,
+    method VARCHAR(255) NOT NULL,
+    payments_total BIGINT NOT NULL DEFAULT 0,
+    amount_total DECIMAL(18,2) NOT NULL DEFAULT 0,
+    succeeded_total BIGINT NOT NULL DEFAULT 0,
+    succeeded_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    failed_total BIGINT NOT NULL DEFAULT 0,
+    refunded_total BIGINT NOT NULL DEFAULT 0,
+    refunded_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, method)
+);
+"""
+    for table in TABLES.values()
+)
+
+# Both payment tiers (see archive.py); rollups cover archived payments too
+SOURCES = ("payments", "payments_archive")
+
+FIELDS = (
+    "payments_total", "amount_total", "succeeded_total", "succeeded_amount",
+    "failed_total", "refunded_total", "refunded_amount",
+)
+
+
+def _bucket(granularity, ts):
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert(cursor, table, columns, totals):
+    """Add `totals` ({(bucket, method): values}) to `columns` of `table`, in key order."""
+    updates = ", ".join(f"{col} = {col} + VALUES({col})" for col in columns)
+    cursor.executemany(
+        f"INSERT INTO {table} (bucket_start, method, {', '.join(columns)})"
+        f" VALUES (%s, %s, {', '.join(['%s'] * len(columns))})"
+        f" ON DUPLICATE KEY UPDATE {updates}",
+        [(bucket, method, *values) for (bucket, method), values in sorted(totals.items())]
+    )
+
+
+def record_charges(cursor, charges):
+    """Add new payments given as `(created_at, method, status, amount)`; call inside their transaction."""
+    if not charges:
+        return
+    columns = ("payments_total", "amount_total", "succeeded_total", "succeeded_amount", "failed_total")
+    for granularity, table in TABLES.items():
+        totals = {}
+        for created_at, method, status, amount in charges:
+            key = (_bucket(granularity, created_at), method)
+            payments, total, succeeded, succeeded_amount, failed = totals.get(key, (0, 0, 0, 0, 0))
+            totals[key] = (
+                payments + 1,
+                total + amount,
+                succeeded + (1 if status == 1 else 0),
+                succeeded_amount + (amount if status == 1 else 0),
+                failed + (1 if status == 0 else 0),
+            )
+        _upsert(cursor, table, columns, totals)
+
+
+def record_refunds(cursor, refunds):
+    """Add refunds given as `(refunded_at, method, amount)`; call inside the transaction that flipped `refunded`."""
+    if not refunds:
+        return
+    for granularity, table in TABLES.items():
+        totals = {}
+        for refunded_at, method, amount in refunds:
+            key = (_bucket(granularity, refunded_at), method)
+            count, total = totals.get(key, (0, 0))
+            totals[key] = (count + 1, total + amount)
+        _upsert(cursor, table, ("refunded_total", "refunded_amount"), totals)
+
+
+def _backfill_day(cursor, day):
+    """Recompute every rollup row of `[day, day + 1)` from both payment tiers."""
+    params = (day, day + timedelta(days=1))
+    charge_columns = ("payments_total", "amount_total", "succeeded_total", "succeeded_amount", "failed_total")
+    refund_columns = ("refunded_total", "refunded_amount")
+    for granularity, table in TABLES.items():
+        created = BUCKET_SQL[granularity].format(col="created_at")
+        refunded = BUCKET_SQL[granularity].format(col="refunded_at")
+        cursor.execute(f"DELETE FROM {table} WHERE bucket_start >= %s AND bucket_start < %s", params)
+        for source in SOURCES:
+            # One pass per tier and kind so each can use an index; refunds stamped with
+            # refunded_at, then older refunds without it, counted at created_at
+            passes = (
+                (charge_columns,
+                 f"""SELECT {created} AS bucket, method, COUNT(*), COALESCE(SUM(amount), 0),
+                            COALESCE(SUM(status = 1), 0), COALESCE(SUM(IF(status = 1, amount, 0)), 0),
+                            COALESCE(SUM(status = 0), 0)
+                     FROM {source} WHERE created_at >= %s AND created_at < %s"""),
+                (refund_columns,
+                 f"""SELECT {refunded} AS bucket, method, COUNT(*), COALESCE(SUM(amount), 0)
+                     FROM {source} WHERE refunded_at >= %s AND refunded_at < %s"""),
+                (refund_columns,
+                 f"""SELECT {created} AS bucket, method, COUNT(*), COALESCE(SUM(amount), 0)
+                     FROM {source} WHERE created_at >= %s AND created_at < %s
+                       AND refunded = 1 AND refunded_at IS NULL"""),
+            )
+            for columns, select in passes:
+                updates = ", ".join(f"{col} = {col} + VALUES({col})" for col in columns)
+                cursor.execute(
+                    f"INSERT INTO {table} (bucket_start, method, {', '.join(columns)})"
+                    f" {select} GROUP BY bucket, method"
+                    f" ON DUPLICATE KEY UPDATE {updates}",
+                    params
+                )
+
+
+def backfill(conn, start=None, end=None, progress=None):
+    """Recompute the rollups for the days covering `[start, end)` (default: all payments).
+
+    One transaction per day keeps locks short on large tables. Charges or
+    refunds written to a day while it is being recomputed can be missed, so
+    backfill recent days while writes are quiet. Returns the number of days.
+    """
+    cursor = conn.cursor()
+    if start is None or end is None:
+        bounds = []
+        for source in SOURCES:
+            cursor.execute(f"SELECT MIN(created_at), MAX(created_at), MAX(refunded_at) FROM {source}")
+            first, last, last_refund = cursor.fetchone()
+            if first is not None:
+                bounds.append((first, max(last, last_refund or last)))
+        if not bounds:
+            cursor.close()
+            return 0
+        start = start or min(first for first, _ in bounds)
+        end = end or max(last for _, last in bounds) + timedelta(microseconds=1)
+
+    day = _bucket("day", start)
+    days = 0
+    while day < end:
+        _backfill_day(cursor, day)
+        conn.commit()
+        days += 1
+        if progress:
+            progress(day)
+        day += timedelta(days=1)
+    cursor.close()
+    return days
+
+
+def bucket_count(granularity, start, end):
+    """Number of `granularity` buckets overlapping `[start, end)`."""
+    first = _bucket(granularity, start)
+    return max(0, -(-(end - first) // BUCKET_SIZES[granularity]))
+
+
+def read(conn, granularity, start, end, method=None):
+    """Return the rollup rows of buckets overlapping `[start, end)`, ordered by bucket and method."""
+    query = (
+        f"SELECT bucket_start, method, {', '.join(FIELDS)} FROM {TABLES[granularity]}"
+        " WHERE bucket_start >= %s AND bucket_start < %s"
+    )
+    params = [_bucket(granularity, start), end]
+    if method:
+        query += " AND method = %s"
+        params.append(method)
+    query += " ORDER BY bucket_start, method"
+
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    for row in rows:
+        for field in FIELDS:
+            row[field] = float(row[field]) if "amount" in field else int(row[field])
+    return rows
+
+
+def main():
+    import argparse
+
+    from .db import get_connection
+
+    parser = argparse.ArgumentParser(description="Recompute payment rollups from the payments table")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="First day (default: oldest payment)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="End, exclusive (default: newest payment)")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        days = backfill(conn, args.start, args.end, progress=lambda day: print(f"… {day:%Y-%m-%d} done"))
+    finally:
+        conn.close()
+    print(f"✅ Rebuilt payment rollups for {days} day(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, List
 from datetime import datetime
+from .config import settings
 
 
 class PaymentCharge(BaseModel):
@@ -8,6 +9,23 @@ class PaymentCharge(BaseModel):
     amount: float
 
 
+class PaymentChargeBatch(BaseModel):
+    charges: List[PaymentCharge] = Field(..., min_length=1, max_length=settings.PAYMENT_BATCH_MAX_ITEMS)
+
+
+class PaymentChargeResult(BaseModel):
+    order_id: int
+    reference: str
+    status: str
+    message: str
+
+
+class PaymentChargeBatchResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[PaymentChargeResult]
+
+
 class PaymentOut(BaseModel):
     payment_id: int
     order_id: int
@@ -19,11 +37,22 @@ class PaymentOut(BaseModel):
     refunded: bool
 
 
+class OrderPayments(BaseModel):
+    order_id: int
+    payment_status: str
+    payments: List[PaymentOut]
+
+
+class OrderPaymentsBatch(BaseModel):
+    orders: List[OrderPayments]
+
+
 class PaginatedPayments(BaseModel):
     items: List[PaymentOut]
     page: int
     per_page: int
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class RefundResponse(BaseModel):
@@ -31,3 +60,50 @@ class RefundResponse(BaseModel):
     amount: float
     method: str
     message: str
+
+
+class RefundedPayment(BaseModel):
+    payment_id: int
+    amount: float
+    method: str
+
+
+class OrderRefundResponse(BaseModel):
+    order_id: int
+    refunded_count: int
+    amount: float
+    payments: List[RefundedPayment]
+    message: str
+
+
+class PaymentRollupTotals(BaseModel):
+    payments_total: int
+    amount_total: float
+    succeeded_total: int
+    succeeded_amount: float
+    failed_total: int
+    refunded_total: int
+    refunded_amount: float
+
+
+class PaymentRollup(PaymentRollupTotals):
+    bucket_start: datetime
+    method: str
+
+
+class PaymentRollups(BaseModel):
+    granularity: str
+    start: datetime
+    end: datetime
+    items: List[PaymentRollup]
+    totals: PaymentRollupTotals
+
+
+class SimulationReset(BaseModel):
+    seed: Optional[int] = None
+
+
+class SimulationState(BaseModel):
+    seed: Optional[int]
+    draws: int
+    success_rates: Dict[str, float]
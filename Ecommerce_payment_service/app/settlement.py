@@ -0,0 +1,161 @@
+"""
+Streaming daily settlement export (CSV / NDJSON).
+
+A settlement day lists, per payment method, every charge created that day
+followed by every refund issued that day (as a negative adjustment, also for
+payments charged on earlier days), then a subtotal for the method; a grand
+total closes the file. Refunds recorded before `refunded_at` existed count
+on the day of their charge, as in the rollups. Both payment tiers are read.
+
+Rows come off an unbuffered cursor in SETTLEMENT_FETCH_SIZE chunks and only
+the running totals of the current method are kept, so memory stays constant
+however many payments the day has. The export runs on its own connection
+rather than a pooled one, so a long download does not hold a pool slot, and
+one consistent snapshot covers the whole file.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from . import archive
+from .config import settings
+from .db import connect
+
+FIELDS = (
+    "record_type", "method", "payment_id", "order_id", "reference", "status", "amount", "timestamp",
+    "payments", "succeeded", "failed", "gross_amount", "refunds", "refunded_amount", "net_amount",
+)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+_ENTRY_COLUMNS = "payment_id, order_id, reference, method, status, amount"
+
+
+def settlement_query(day):
+    """Charges and refunds of `day` from both tiers, ordered by method, then charges before refunds."""
+    start = datetime.combine(day, time.min)
+    bounds = (start, start + timedelta(days=1))
+    branches = []
+    params = []
+    for table in archive.TIERS:
+        for entry, stamp, where in (
+            ("charge", "created_at", "created_at >= %s AND created_at < %s"),
+            ("refund", "refunded_at", "refunded_at >= %s AND refunded_at < %s"),
+            ("refund", "created_at", "created_at >= %s AND created_at < %s AND refunded = 1 AND refunded_at IS NULL"),
+        ):
+            branches.append(f"SELECT '{entry}' AS entry, {_ENTRY_COLUMNS}, {stamp} AS entry_at FROM {table} WHERE {where}")
+            params.extend(bounds)
+    query = " UNION ALL ".join(branches) + " ORDER BY method, entry, entry_at, payment_id"
+    return query, params
+
+
+class _Totals:
+    def __init__(self):
+        self.payments = self.succeeded = self.failed = self.refunds = 0
+        self.gross = Decimal("0.00")
+        self.refunded = Decimal("0.00")
+
+    def add_charge(self, row):
+        self.payments += 1
+        if row["status"]:
+            self.succeeded += 1
+            self.gross += row["amount"] or 0
+        else:
+            self.failed += 1
+
+    def add_refund(self, row):
+        self.refunds += 1
+        self.refunded += row["amount"] or 0
+
+    def merge(self, other):
+        for field in ("payments", "succeeded", "failed", "refunds", "gross", "refunded"):
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def record(self, record_type, method=None):
+        return {
+            "record_type": record_type, "method": method,
+            "payments": self.payments, "succeeded": self.succeeded, "failed": self.failed,
+            "gross_amount": self.gross, "refunds": self.refunds, "refunded_amount": self.refunded,
+            "net_amount": self.gross - self.refunded,
+        }
+
+
+def _entry_record(row):
+    amount = row["amount"] or Decimal("0.00")
+    return {
+        "record_type": "payment" if row["entry"] == "charge" else "refund",
+        "method": row["method"],
+        "payment_id": row["payment_id"],
+        "order_id": row["order_id"],
+        "reference": row["reference"],
+        "status": "REFUNDED" if row["entry"] == "refund" else "SUCCESS" if row["status"] else "FAILED",
+        # refunds are adjustments against the settlement
+        "amount": amount if row["entry"] == "charge" else -amount,
+        "timestamp": row["entry_at"].isoformat() if row["entry_at"] else None,
+    }
+
+
+def _ndjson(records):
+    return "".join(
+        json.dumps({
+            key: float(value) if isinstance(value, Decimal) else value
+            for key, value in record.items() if value is not None
+        }) + "\n"
+        for record in records
+    )
+
+
+def _csv(records, header=False):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+
+def stream_settlement(fmt, day):
+    """Yield the settlement file for `day` in chunks of about SETTLEMENT_FETCH_SIZE rows."""
+    serialize = _csv if fmt == "csv" else _ndjson
+    if fmt == "csv":
+        yield _csv([], header=True)
+
+    query, params = settlement_query(day)
+    conn = connect()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, params)
+        grand = _Totals()
+        method, totals = None, None
+        while True:
+            rows = cursor.fetchmany(settings.SETTLEMENT_FETCH_SIZE)
+            if not rows:
+                break
+            records = []
+            for row in rows:
+                if row["method"] != method:
+                    if totals is not None:
+                        records.append(totals.record("subtotal", method))
+                        grand.merge(totals)
+                    method, totals = row["method"], _Totals()
+                if row["entry"] == "charge":
+                    totals.add_charge(row)
+                else:
+                    totals.add_refund(row)
+                records.append(_entry_record(row))
+            yield serialize(records)
+
+        tail = []
+        if totals is not None:
+            tail.append(totals.record("subtotal", method))
+            grand.merge(totals)
+        tail.append(grand.record("total"))
+        yield serialize(tail)
+        cursor.close()
+    finally:
+        # Also when the client went away mid-stream: closing the connection drops
+        # the rest of the result set instead of reading it
+        conn.close()
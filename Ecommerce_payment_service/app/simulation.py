@@ -0,0 +1,104 @@
+"""
+Simulated payment gateway outcomes.
+
+The service has no real gateway: every charge draws its method and success
+from `simulator`. With PAYMENT_SIM_SEED set the draws come from a seeded
+generator, so a load test replays the same method/status sequence on every
+run (interleaving across concurrent requests still follows arrival order).
+PAYMENT_SIM_SUCCESS_RATES sets the success probability per method, and
+PAYMENT_SIM_LATENCY / PAYMENT_SIM_LATENCY_MS add a simulated gateway delay.
+
+References are not part of the seeded sequence: they must stay unique
+across runs against the same database.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from .config import settings
+
+LATENCY_DISTRIBUTIONS = ("none", "fixed", "uniform", "exponential")
+
+
+@dataclass(frozen=True)
+class Outcome:
+    method: str
+    status: int  # 1 success, 0 failed, as stored in payments.status
+
+
+def latency_distribution(name, mean_ms):
+    """Return a `rng -> seconds` sampler for one of LATENCY_DISTRIBUTIONS with the given mean."""
+    mean = mean_ms / 1000.0
+    if name == "none" or mean <= 0:
+        return lambda rng: 0.0
+    if name == "fixed":
+        return lambda rng: mean
+    if name == "uniform":
+        return lambda rng: rng.uniform(0.0, 2 * mean)
+    if name == "exponential":
+        return lambda rng: rng.expovariate(1 / mean)
+    raise ValueError(f"Unknown latency distribution '{name}'; expected one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+
+
+class PaymentSimulator:
+    """Thread-safe source of payment outcomes and simulated gateway latency.
+
+    `success_rates` maps each method to its success probability; methods are
+    picked uniformly in the table's order. `latency` is any `rng -> seconds`
+    callable (see `latency_distribution`).
+    """
+
+    def __init__(self, success_rates, seed=None, latency=None):
+        if not success_rates:
+            raise ValueError("success_rates needs at least one method")
+        for method, rate in success_rates.items():
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError(f"Success rate for {method} must be between 0 and 1")
+        self.success_rates = dict(success_rates)
+        self._methods = list(self.success_rates)
+        self.latency = latency or latency_distribution("none", 0)
+        self._lock = threading.Lock()
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Restart the outcome sequence; the same seed replays the same draws."""
+        with self._lock:
+            self.seed = seed
+            self._rng = random.Random(seed)
+            self.draws = 0
+
+    def _draw(self):
+        method = self._rng.choice(self._methods)
+        status = 1 if self._rng.random() < self.success_rates[method] else 0
+        return Outcome(method, status)
+
+    def draw(self):
+        """Draw one outcome and the gateway latency (seconds) to simulate for it."""
+        with self._lock:
+            self.draws += 1
+            return self._draw(), self.latency(self._rng)
+
+    def draw_many(self, count):
+        """Draw `count` outcomes in one go, plus one latency for the whole batch call."""
+        with self._lock:
+            self.draws += count
+            return [self._draw() for _ in range(count)], self.latency(self._rng)
+
+    def state(self):
+        with self._lock:
+            return {"seed": self.seed, "draws": self.draws, "success_rates": dict(self.success_rates)}
+
+
+def wait(latency):
+    """Sleep for a simulated gateway latency."""
+    if latency > 0:
+        time.sleep(latency)
+
+
+simulator = PaymentSimulator(
+    settings.PAYMENT_SIM_SUCCESS_RATES,
+    seed=settings.PAYMENT_SIM_SEED,
+    latency=latency_distribution(settings.PAYMENT_SIM_LATENCY, settings.PAYMENT_SIM_LATENCY_MS),
+)
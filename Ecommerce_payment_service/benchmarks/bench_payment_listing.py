@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark filtered `crud.fetch_payments` listings on a large synthetic table.
+
+Seeds payments into a dedicated database (with the composite indexes from
+`csv_loader.create_table_if_not_exists`) and reports median / p95 latency of
+typical filtered listings, first page and a deep page reached by cursor:
+
+    python -m benchmarks.bench_payment_listing --password rootpass --rows 20000000
+
+Cursor pages skip the COUNT(*) (`include_total=False`) and should stay in
+single-digit milliseconds at any depth; OFFSET pages are shown for contrast.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_loader import create_table_if_not_exists  # noqa: E402
+
+METHODS = ["UPI", "CARD", "COD"]
+SCENARIOS = {
+    "no filter": {},
+    "order_id": {"order_id": 4242},
+    "method+status": {"method": "UPI", "status": "SUCCESS"},
+    "status": {"status": "FAILED"},
+    "date range": {"start_date": "2025-03-01 00:00:00", "end_date": "2025-03-08 00:00:00"},
+    "method+status+date": {"method": "CARD", "status": "SUCCESS",
+                           "start_date": "2025-06-01 00:00:00", "end_date": "2025-06-30 00:00:00"},
+}
+
+
+def seed(conn, rows, orders, batch_size=10_000):
+    """Fill `payments` with `rows` synthetic payments over one year (skipped if already there)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM payments")
+    existing = cursor.fetchone()[0]
+    if existing >= rows:
+        print(f"Using existing {existing} rows.")
+        return
+
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    seconds = 365 * 24 * 3600
+    sql = ("INSERT INTO payments (payment_id, order_id, amount, method, status, reference, created_at, refunded)"
+           " VALUES (%s,%s,%s,%s,%s,%s,%s,%s)")
+    started = time.perf_counter()
+    for first in range(existing + 1, rows + 1, batch_size):
+        batch = []
+        for i in range(first, min(first + batch_size, rows + 1)):
+            status = 1 if rng.random() < 0.6 else 0
+            batch.append((
+                i, rng.randint(1, orders), round(rng.uniform(10, 5000), 2), rng.choice(METHODS), status,
+                f"BENCH-{i:012d}", start + timedelta(seconds=rng.randrange(seconds)),
+                1 if status and rng.random() < 0.05 else 0,
+            ))
+        cursor.executemany(sql, batch)
+        conn.commit()
+    cursor.close()
+    print(f"Seeded {rows - existing} rows in {time.perf_counter() - started:.1f}s.")
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), statistics.quantiles(samples, n=20)[-1]
+
+
+def run(args):
+    from app import crud, db
+
+    # Tables seeded by an older loader may predate the indexes
+    db.ensure_indexes("payments", crud.PAYMENT_INDEXES)
+    print(f"{'scenario':<20} {'mode':<14} {'median ms':>10} {'p95 ms':>8}")
+    slow = []
+    for name, filters in SCENARIOS.items():
+        # Walk the cursor to the deep page (untimed)
+        cursor = None
+        for _ in range(args.deep_pages):
+            _, _, next_cursor = crud.fetch_payments(per_page=args.per_page, include_total=False, cursor=cursor, **filters)
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+
+        cases = [
+            ("cursor page 1", lambda: crud.fetch_payments(per_page=args.per_page, include_total=False, **filters)),
+            ("cursor deep", lambda: crud.fetch_payments(per_page=args.per_page, include_total=False,
+                                                        cursor=cursor, **filters)),
+            ("offset deep", lambda: crud.fetch_payments(page=args.deep_pages + 1, per_page=args.per_page,
+                                                        include_total=False, **filters)),
+        ]
+        for mode, fn in cases:
+            median, p95 = timed(fn, args.repeat)
+            print(f"{name:<20} {mode:<14} {median:>10.2f} {p95:>8.2f}")
+            if mode.startswith("cursor") and median >= 10:
+                slow.append(f"{name} / {mode}")
+
+    if slow:
+        print(f"\nAbove 10 ms: {', '.join(slow)}")
+        sys.exit(1)
+    print("\nAll cursor listings under 10 ms.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtered payment listing benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--db", default="ecommerce_bench", help="Scratch database (created if missing)")
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--orders", type=int, default=5_000_000, help="Distinct order_ids in the synthetic data")
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--deep-pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if args.repeat < 2:
+        parser.error("--repeat must be at least 2")
+
+    server = mysql.connector.connect(host=args.host, user=args.user, password=args.password)
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.db}`")
+    server.close()
+
+    conn = mysql.connector.connect(host=args.host, user=args.user, password=args.password, database=args.db)
+    create_table_if_not_exists(conn)
+    seed(conn, args.rows, args.orders)
+    conn.close()
+
+    # The app builds its pool from the environment at import time
+    os.environ.update({
+        "MYSQL_HOST": args.host,
+        "MYSQL_USER": args.user,
+        "MYSQL_PASSWORD": args.password,
+        "MYSQL_DB": args.db,
+    })
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
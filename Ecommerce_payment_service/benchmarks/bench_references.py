@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Compare payment reference schemes: sustained insert throughput and index size.
+
+Inserts the same synthetic payments into two scratch tables shaped like
+`payments` (AUTO_INCREMENT id + UNIQUE `reference`), one with the old
+`ECI20250910-` + 8 random hex references and one with the time-ordered ULID
+references from `app/references.py`:
+
+    python -m benchmarks.bench_references --password rootpass --rows 5000000
+
+Throughput is printed per `--report-every` rows, so the slowdown of random
+keys once the index outgrows the buffer pool shows up as falling rates. The
+old scheme's collisions are counted (INSERT IGNORE drops them) rather than
+failing the run. At the end the `reference` index size and leaf pages come
+from `mysql.innodb_index_stats` after ANALYZE TABLE.
+"""
+
+import argparse
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.references import ReferenceGenerator  # noqa: E402
+
+METHODS = ["UPI", "CARD", "COD"]
+
+DDL = """
+CREATE TABLE {table} (
+    payment_id INT AUTO_INCREMENT PRIMARY KEY,
+    order_id INT NOT NULL,
+    amount DECIMAL(10,2),
+    method VARCHAR(255) NOT NULL,
+    status BOOLEAN,
+    reference VARCHAR(100) UNIQUE,
+    created_at TIMESTAMP,
+    refunded BOOLEAN NOT NULL DEFAULT 0
+)
+"""
+
+
+def legacy_reference():
+    return f"ECI20250910-{secrets.token_hex(4).upper()}"
+
+
+SCHEMES = {
+    "legacy": ("bench_ref_legacy", legacy_reference),
+    "ulid": ("bench_ref_ulid", ReferenceGenerator().new_reference),
+}
+
+
+def insert_rows(conn, table, new_reference, rows, batch_size, report_every):
+    """Insert `rows` payments; returns (inserted, seconds, [(rows, rows/s) per window])."""
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(DDL.format(table=table))
+    sql = (f"INSERT IGNORE INTO {table} (order_id, amount, method, status, reference, created_at, refunded)"
+           " VALUES (%s,%s,%s,%s,%s,%s,%s)")
+
+    # Same payload for both schemes; only the reference differs
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    inserted = 0
+    windows = []
+    started = window_started = time.perf_counter()
+    window_rows = 0
+    for first in range(0, rows, batch_size):
+        batch = [
+            (rng.randint(1, 5_000_000), round(rng.uniform(10, 5000), 2), rng.choice(METHODS),
+             1 if rng.random() < 0.6 else 0, new_reference(), start + timedelta(seconds=i), 0)
+            for i in range(first, min(first + batch_size, rows))
+        ]
+        cursor.executemany(sql, batch)
+        inserted += cursor.rowcount
+        conn.commit()
+        window_rows += len(batch)
+        if window_rows >= report_every:
+            now = time.perf_counter()
+            windows.append((first + len(batch), window_rows / (now - window_started)))
+            print(f"  {table}: {first + len(batch):>12,} rows  {windows[-1][1]:>10,.0f} rows/s")
+            window_started, window_rows = now, 0
+    elapsed = time.perf_counter() - started
+    cursor.close()
+    return inserted, elapsed, windows
+
+
+def index_stats(conn, database, table):
+    """Return (size_mb, leaf_pages) of the `reference` index."""
+    cursor = conn.cursor()
+    cursor.execute(f"ANALYZE TABLE {table}")
+    cursor.fetchall()
+    cursor.execute(
+        "SELECT stat_name, stat_value FROM mysql.innodb_index_stats"
+        " WHERE database_name = %s AND table_name = %s AND index_name = 'reference'"
+        " AND stat_name IN ('size', 'n_leaf_pages')",
+        (database, table)
+    )
+    stats = dict(cursor.fetchall())
+    cursor.execute("SELECT @@innodb_page_size")
+    page_size = cursor.fetchone()[0]
+    cursor.close()
+    return stats.get("size", 0) * page_size / 1024 / 1024, stats.get("n_leaf_pages", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference scheme insert/index benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--db", default="ecommerce_bench", help="Scratch database (created if missing)")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--report-every", type=int, default=500_000)
+    parser.add_argument("--schemes", nargs="+", choices=sorted(SCHEMES), default=["legacy", "ulid"])
+    args = parser.parse_args()
+
+    server = mysql.connector.connect(host=args.host, user=args.user, password=args.password)
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.db}`")
+    server.close()
+    conn = mysql.connector.connect(host=args.host, user=args.user, password=args.password, database=args.db)
+
+    results = {}
+    for scheme in args.schemes:
+        table, new_reference = SCHEMES[scheme]
+        print(f"Inserting {args.rows:,} rows with {scheme} references…")
+        inserted, elapsed, windows = insert_rows(conn, table, new_reference, args.rows,
+                                                 args.batch_size, args.report_every)
+        size_mb, leaf_pages = index_stats(conn, args.db, table)
+        results[scheme] = (inserted, elapsed, windows, size_mb, leaf_pages)
+    conn.close()
+
+    print(f"\n{'scheme':<8} {'inserted':>12} {'collisions':>10} {'avg rows/s':>11} {'last rows/s':>12}"
+          f" {'ref index MB':>13} {'leaf pages':>11}")
+    for scheme, (inserted, elapsed, windows, size_mb, leaf_pages) in results.items():
+        last = windows[-1][1] if windows else inserted / elapsed
+        print(f"{scheme:<8} {inserted:>12,} {args.rows - inserted:>10,} {inserted / elapsed:>11,.0f}"
+              f" {last:>12,.0f} {size_mb:>13.1f} {leaf_pages:>11,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Concurrency check for `Idempotency-Key` on `POST /v1/payments/charge`.
+
+Against a running service, fires `--duplicates` identical charges per key in
+parallel for `--keys` fresh keys, then verifies that every duplicate got the
+same reference/status and that each order ended up with exactly one payment.
+It also checks that reusing a key for a different amount is rejected with 422:
+
+    python -m benchmarks.check_idempotent_charges --url http://127.0.0.1:8003 --keys 50 --duplicates 20
+
+Exits with status 1 on any violation.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def request(method, url, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method,
+                                 headers={"Content-Type": "application/json", **(headers or {})})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as res:
+            return res.status, dict(res.headers), json.loads(res.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.loads(e.read() or b"null")
+
+
+def charge(base_url, key, order_id, amount):
+    return request("POST", f"{base_url}/v1/payments/charge",
+                   {"order_id": order_id, "amount": amount}, {"Idempotency-Key": key})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire duplicate idempotency keys in parallel")
+    parser.add_argument("--url", default="http://127.0.0.1:8003", help="Payment service base URL")
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--duplicates", type=int, default=20)
+    # Keep below the service's connection pool size (5): each blocked duplicate holds a connection
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:12]
+    # Order ids far above real data so the per-order check only sees this run
+    base_order = random.randint(10**8, 2 * 10**9 - args.keys)
+    jobs = [
+        (f"check-{run_id}-{k}", base_order + k, 100.0 + k)
+        for k in range(args.keys)
+        for _ in range(args.duplicates)
+    ]
+    random.shuffle(jobs)
+
+    failures = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda job: (job, charge(args.url, *job)), jobs))
+    elapsed = time.perf_counter() - started
+
+    outcomes = {}
+    replayed = 0
+    for (key, order_id, _), (status_code, headers, body) in results:
+        if status_code != 201:
+            failures.append(f"{key}: HTTP {status_code} {body}")
+            continue
+        outcomes.setdefault(key, set()).add((body["reference"], body["status"]))
+        replayed += headers.get("Idempotent-Replayed") == "true"
+
+    for key, distinct in outcomes.items():
+        if len(distinct) != 1:
+            failures.append(f"{key}: {len(distinct)} different outcomes {sorted(distinct)}")
+
+    for k in range(args.keys):
+        query = urllib.parse.urlencode({"order_id": base_order + k, "per_page": 10})
+        _, _, page = request("GET", f"{args.url}/v1/payments?{query}")
+        if page["total"] != 1:
+            failures.append(f"order {base_order + k}: {page['total']} payments")
+
+    status_code, _, _ = charge(args.url, f"check-{run_id}-0", base_order, 999.0)
+    if status_code != 422:
+        failures.append(f"key reused with a different amount returned HTTP {status_code}, expected 422")
+
+    print(f"{len(jobs)} charges for {args.keys} keys in {elapsed:.2f}s; {replayed} replayed.")
+    for failure in failures[:20]:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: one payment and one outcome per key.")
+
+
+if __name__ == "__main__":
+    main()
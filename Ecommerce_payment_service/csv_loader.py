@@ -1,19 +1,51 @@
 #!/usr/bin/env python3
 """
-Simple CSV → MySQL loader for product catalog.
+Streaming CSV → MySQL loader for payments.
+
+Rows are read lazily and upserted in multi-row `executemany` batches, one
+commit per `--commit-every` rows, optionally on several worker connections.
+Memory stays bounded by `workers * commit_every` rows whatever the file size,
+and `--checkpoint` makes an interrupted load resumable. `--load-data-infile`
+hands the whole file to `LOAD DATA LOCAL INFILE` instead.
+
+Rows always land in the hot `payments` table. Ids that were already moved to
+`payments_archive` are removed from `payments` again after the load, before
+the counters and rollups are rebuilt, so a rerun after archiving never leaves
+a payment in both tiers; the archived copy (with any later refund) is kept.
 """
 
 import csv
+import itertools
+import json
+import os
+import threading
+import time
 import mysql.connector
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from app import archive, counters, rollups
 
-def connect_db(host, user, password, database):
+UPSERT_SQL = """
+    INSERT INTO payments (payment_id, order_id, amount, method, status, reference, created_at, refunded)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        order_id=VALUES(order_id),
+        amount=VALUES(amount),
+        method=VALUES(method),
+        status=VALUES(status),
+        reference=VALUES(reference),
+        created_at=VALUES(created_at),
+        refunded=VALUES(refunded)
+"""
+
+def connect_db(host, user, password, database, allow_local_infile=False):
     """Establish a connection to MySQL."""
     return mysql.connector.connect(
         host=host,
         user=user,
         password=password,
-        database=database
+        database=database,
+        allow_local_infile=allow_local_infile
     )
 
 def create_table_if_not_exists(conn):
@@ -28,59 +60,233 @@ def create_table_if_not_exists(conn):
         status BOOLEAN,
         reference VARCHAR(100) UNIQUE,
         created_at TIMESTAMP,
-        refunded BOOLEAN NOT NULL DEFAULT 0
+        refunded BOOLEAN NOT NULL DEFAULT 0,
+        refunded_at TIMESTAMP(6) NULL,
+        -- listing filters + keyset pagination on (created_at, payment_id)
+        INDEX idx_payments_created (created_at, payment_id),
+        INDEX idx_payments_order_created (order_id, created_at, payment_id),
+        INDEX idx_payments_method_status_created (method, status, created_at, payment_id),
+        INDEX idx_payments_status_created (status, created_at, payment_id),
+        INDEX idx_payments_refunded_at (refunded_at)
     );
     """
     cursor.execute(ddl)
+    cursor.execute(archive.DDL)
+    cursor.execute(counters.DDL)
+    for ddl in rollups.DDL:
+        cursor.execute(ddl)
     conn.commit()
     cursor.close()
     print("✅ Ensured table 'payments' exists.")
 
-def load_csv(csv_path, conn):
-    """Read the CSV and insert/update rows."""
+def row_values(row):
+    """Convert one CSV record into the UPSERT_SQL parameter tuple."""
+    return (
+        int(row['payment_id']),
+        int(row['order_id']),
+        float(row['amount']),
+        row['method'],
+        # Convert status to boolean --> SUCCESS = 1, FAILED = 0
+        1 if row['status'].strip().upper() == 'SUCCESS' else 0,
+        row['reference'],
+        row['created_at'],
+        0,  # refunded not present in CSV; set to 0
+    )
+
+def sniff_dialect(csvfile):
+    # Try to detect delimiter automatically, but assume tab if not comma-separated
+    sample = csvfile.read(1024)
+    csvfile.seek(0)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters="\t,")
+    except csv.Error:
+        return csv.get_dialect('excel')
+
+class Checkpoint:
+    """Persists how many leading CSV rows are committed, so a load can resume.
+
+    Chunks may finish out of order on parallel workers; the watermark only
+    advances over a contiguous run of committed chunks.
+    """
+
+    def __init__(self, path, csv_path):
+        self.path = path
+        self.source = {"csv": os.path.abspath(csv_path), "size": os.path.getsize(csv_path)}
+        self.rows_committed = 0
+        self._done = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("source") == self.source:
+                self.rows_committed = state["rows_committed"]
+            else:
+                print(f"⚠️ Checkpoint {path} belongs to a different file; starting from the top.")
+
+    def mark_done(self, start, end):
+        with self._lock:
+            self._done[start] = end
+            while self.rows_committed in self._done:
+                self.rows_committed = self._done.pop(self.rows_committed)
+            if self.path:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"source": self.source, "rows_committed": self.rows_committed}, f)
+                os.replace(tmp_path, self.path)
+
+class Progress:
+    """Thread-safe row counter that prints throughput at most every `interval` seconds."""
+
+    def __init__(self, interval=5.0):
+        self.rows = 0
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def add(self, rows):
+        with self._lock:
+            self.rows += rows
+            now = time.perf_counter()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                print(f"… {self.rows} rows loaded ({self.rows / (now - self.started):,.0f} rows/s)")
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return f"{self.rows} rows in {elapsed:.1f}s ({self.rows / elapsed if elapsed else 0:,.0f} rows/s)"
+
+def iter_chunks(reader, size, start=0):
+    """Yield `(first_row_number, values)` chunks of at most `size` converted rows."""
+    rows = itertools.islice(reader, start, None)
+    while True:
+        chunk = [row_values(row) for row in itertools.islice(rows, size)]
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+def write_chunk(conn, chunk, batch_size):
+    """Upsert one chunk as multi-row statements and commit it."""
     cursor = conn.cursor()
+    for i in range(0, len(chunk), batch_size):
+        cursor.executemany(UPSERT_SQL, chunk[i:i + batch_size])
+    conn.commit()
+    cursor.close()
+
+def load_csv(csv_path, connect, batch_size=1000, commit_every=10000, workers=1, checkpoint_path=None):
+    """Stream the CSV into `payments`.
+
+    `connect` returns a new connection; each worker thread opens its own.
+    """
+    checkpoint = Checkpoint(checkpoint_path, csv_path)
+    if checkpoint.rows_committed:
+        print(f"↪️ Resuming after {checkpoint.rows_committed} committed rows.")
+    progress = Progress()
+
+    with open(csv_path, newline='') as csvfile:
+        reader = csv.DictReader(csvfile, dialect=sniff_dialect(csvfile))
+        chunks = iter_chunks(reader, commit_every, checkpoint.rows_committed)
+
+        if workers <= 1:
+            conn = connect()
+            try:
+                for start, chunk in chunks:
+                    write_chunk(conn, chunk, batch_size)
+                    checkpoint.mark_done(start, start + len(chunk))
+                    progress.add(len(chunk))
+            finally:
+                conn.close()
+        else:
+            local = threading.local()
+            connections = []
+            # At most two chunks per worker are in memory at any time
+            slots = threading.BoundedSemaphore(workers * 2)
+
+            def work(start, chunk):
+                try:
+                    if not hasattr(local, "conn"):
+                        local.conn = connect()
+                        connections.append(local.conn)
+                    write_chunk(local.conn, chunk, batch_size)
+                    checkpoint.mark_done(start, start + len(chunk))
+                    progress.add(len(chunk))
+                finally:
+                    slots.release()
+
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = []
+                    for start, chunk in chunks:
+                        slots.acquire()
+                        futures.append(pool.submit(work, start, chunk))
+                        # Surface worker errors early and drop finished futures
+                        for future in [f for f in futures if f.done()]:
+                            future.result()
+                            futures.remove(future)
+                    for future in futures:
+                        future.result()
+            finally:
+                for conn in connections:
+                    conn.close()
+
+    print(f"✅ CSV data successfully loaded into 'payments' table: {progress.summary()}.")
+
+def load_data_infile(csv_path, conn):
+    """Bulk-load the whole file server-side with LOAD DATA LOCAL INFILE (replaces existing ids)."""
     with open(csv_path, newline='') as csvfile:
-        # Try to detect delimiter automatically, but assume tab if not comma-separated
-        sample = csvfile.read(1024)
-        csvfile.seek(0)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters="\t,")
-        except Exception:
-            # Fallback to comma if sniffing fails on small/irregular samples
-            dialect = csv.get_dialect('excel')
-        reader = csv.DictReader(csvfile, dialect=dialect)
-
-        for row in reader:
-
-            sql = """
-                INSERT INTO payments (payment_id, order_id, amount, method, status, reference, created_at, refunded)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    payment_id=VALUES(payment_id),
-                    order_id=VALUES(order_id),
-                    amount=VALUES(amount),
-                    method=VALUES(method),
-                    status=VALUES(status),
-                    reference=VALUES(reference),
-                    created_at=VALUES(created_at),
-                    refunded=VALUES(refunded);
-            """
-            vals = (
-                int(row['payment_id']),
-                int(row['order_id']),
-                float(row['amount']),
-                row['method'],
-                # Convert status to boolean --> SUCCESS = 1, FAILED = 0
-                1 if row['status'].upper() == 'SUCCESS' else 0,
-                row['reference'],
-                row['created_at'],
-                0,  # refunded not present in CSV; set to 0
-            )
-            cursor.execute(sql, vals)
+        dialect = sniff_dialect(csvfile)
+        first_line = csvfile.readline()
+    header = next(csv.reader([first_line], dialect=dialect))
+    line_terminator = "\r\n" if first_line.endswith("\r\n") else "\n"
 
+    columns = ", ".join("@status" if name == "status" else f"`{name}`" for name in header)
+    sql = f"""
+        LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE payments
+        FIELDS TERMINATED BY %s OPTIONALLY ENCLOSED BY '"'
+        LINES TERMINATED BY %s
+        IGNORE 1 LINES
+        ({columns})
+        SET status = (UPPER(TRIM(@status)) = 'SUCCESS'), refunded = 0
+    """
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute(sql, (os.path.abspath(csv_path), dialect.delimiter, line_terminator))
+    loaded = cursor.rowcount
     conn.commit()
     cursor.close()
-    print("✅ CSV data successfully loaded into 'payments' table.")
+    print(f"✅ LOAD DATA loaded {loaded} rows into 'payments' in {time.perf_counter() - started:.1f}s.")
+
+def drop_archived(conn, batch_size=1000):
+    """Delete loaded rows whose payment_id is already archived, in batches; returns how many."""
+    cursor = conn.cursor()
+    dropped = 0
+    while True:
+        cursor.execute(
+            f"SELECT p.payment_id FROM payments p JOIN {archive.TABLE} a ON a.payment_id = p.payment_id LIMIT %s",
+            (batch_size,)
+        )
+        ids = [payment_id for (payment_id,) in cursor.fetchall()]
+        if not ids:
+            break
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"DELETE FROM payments WHERE payment_id IN ({placeholders})", ids)
+        conn.commit()
+        dropped += len(ids)
+    cursor.close()
+    if dropped:
+        print(f"✅ Dropped {dropped} loaded rows that are already in '{archive.TABLE}'.")
+    return dropped
+
+def rebuild_counters(conn):
+    """Recompute the /metrics payment counters from the loaded payments."""
+    counters.rebuild(conn)
+    print("✅ Payment counters rebuilt.")
+
+def rebuild_rollups(conn):
+    """Recompute the hourly/daily payment rollups for the loaded date range."""
+    days = rollups.backfill(conn)
+    print(f"✅ Payment rollups rebuilt for {days} day(s).")
 
 def main():
     parser = argparse.ArgumentParser(description="Load CSV into MySQL 'payments' table")
@@ -89,11 +295,27 @@ def main():
     parser.add_argument("--user", default="root", help="MySQL username")
     parser.add_argument("--password", required=True, help="MySQL password")
     parser.add_argument("--db", default="ecommerce", help="Target database name")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per multi-row INSERT")
+    parser.add_argument("--commit-every", type=int, default=10000, help="Rows per transaction / chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel chunk writers (one connection each)")
+    parser.add_argument("--checkpoint", help="File recording committed rows, used to resume an interrupted load")
+    parser.add_argument("--load-data-infile", action="store_true",
+                        help="Use LOAD DATA LOCAL INFILE (needs local_infile=ON on the server)")
     args = parser.parse_args()
 
-    conn = connect_db(args.host, args.user, args.password, args.db)
+    def connect():
+        return connect_db(args.host, args.user, args.password, args.db,
+                          allow_local_infile=args.load_data_infile)
+
+    conn = connect()
     create_table_if_not_exists(conn)
-    load_csv(args.csv, conn)
+    if args.load_data_infile:
+        load_data_infile(args.csv, conn)
+    else:
+        load_csv(args.csv, connect, args.batch_size, args.commit_every, args.workers, args.checkpoint)
+    drop_archived(conn, args.batch_size)
+    rebuild_counters(conn)
+    rebuild_rollups(conn)
     conn.close()
 
 if __name__ == "__main__":
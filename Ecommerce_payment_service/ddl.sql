@@ -9,5 +9,75 @@ CREATE TABLE IF NOT EXISTS payments (
     status BOOLEAN,
     reference VARCHAR(100) UNIQUE,
     created_at TIMESTAMP,
-    refunded BOOLEAN NOT NULL DEFAULT 0
-);
\ No newline at end of file
+    refunded BOOLEAN NOT NULL DEFAULT 0,
+    refunded_at TIMESTAMP(6) NULL,
+    -- listing filters + keyset pagination on (created_at, payment_id)
+    INDEX idx_payments_created (created_at, payment_id),
+    INDEX idx_payments_order_created (order_id, created_at, payment_id),
+    INDEX idx_payments_method_status_created (method, status, created_at, payment_id),
+    INDEX idx_payments_status_created (status, created_at, payment_id),
+    INDEX idx_payments_refunded_at (refunded_at)
+);
+
+-- Cold tier: payments older than PAYMENT_ARCHIVE_AFTER_DAYS (see app/archive.py)
+CREATE TABLE IF NOT EXISTS payments_archive (
+    payment_id INT PRIMARY KEY,
+    order_id INT NOT NULL,
+    amount DECIMAL(10,2),
+    method VARCHAR(255) NOT NULL,
+    status BOOLEAN,
+    reference VARCHAR(100) UNIQUE,
+    created_at TIMESTAMP,
+    refunded BOOLEAN NOT NULL DEFAULT 0,
+    refunded_at TIMESTAMP(6) NULL,
+    INDEX idx_payments_archive_created (created_at, payment_id),
+    INDEX idx_payments_archive_order_created (order_id, created_at, payment_id),
+    INDEX idx_payments_archive_method_status_created (method, status, created_at, payment_id),
+    INDEX idx_payments_archive_status_created (status, created_at, payment_id),
+    INDEX idx_payments_archive_refunded_at (refunded_at)
+);
+
+-- Per-method counters behind /metrics (see app/counters.py)
+CREATE TABLE IF NOT EXISTS payment_counters (
+    method VARCHAR(255) PRIMARY KEY,
+    payments_total BIGINT NOT NULL DEFAULT 0,
+    failed_total BIGINT NOT NULL DEFAULT 0,
+    refunded_total BIGINT NOT NULL DEFAULT 0
+);
+
+-- Hourly/daily rollups behind GET /v1/payments/rollups (see app/rollups.py)
+CREATE TABLE IF NOT EXISTS payment_rollups_hourly (
+    bucket_start DATETIME NOT NULL,
+    method VARCHAR(255) NOT NULL,
+    payments_total BIGINT NOT NULL DEFAULT 0,
+    amount_total DECIMAL(18,2) NOT NULL DEFAULT 0,
+    succeeded_total BIGINT NOT NULL DEFAULT 0,
+    succeeded_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    failed_total BIGINT NOT NULL DEFAULT 0,
+    refunded_total BIGINT NOT NULL DEFAULT 0,
+    refunded_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, method)
+);
+
+CREATE TABLE IF NOT EXISTS payment_rollups_daily (
+    bucket_start DATETIME NOT NULL,
+    method VARCHAR(255) NOT NULL,
+    payments_total BIGINT NOT NULL DEFAULT 0,
+    amount_total DECIMAL(18,2) NOT NULL DEFAULT 0,
+    succeeded_total BIGINT NOT NULL DEFAULT 0,
+    succeeded_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    failed_total BIGINT NOT NULL DEFAULT 0,
+    refunded_total BIGINT NOT NULL DEFAULT 0,
+    refunded_amount DECIMAL(18,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, method)
+);
+
+-- Idempotency-Key store for POST /v1/payments/charge (see app/idempotency.py)
+CREATE TABLE IF NOT EXISTS payment_idempotency_keys (
+    idempotency_key VARCHAR(255) PRIMARY KEY,
+    request_hash CHAR(64) NOT NULL,
+    response TEXT NULL,
+    created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    expires_at TIMESTAMP(6) NOT NULL,
+    INDEX idx_payment_idempotency_keys_expires (expires_at)
+);
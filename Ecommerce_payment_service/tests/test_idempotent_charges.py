@@ -0,0 +1,93 @@
+"""
+Parallel duplicate charges against a real MySQL database.
+
+Needs the service's MYSQL_* settings (the test is skipped without
+MYSQL_PASSWORD or a reachable server) and the test client's dependencies:
+
+    pip install pytest httpx
+    MYSQL_PASSWORD=rootpass python -m pytest tests
+"""
+
+import os
+import random
+import threading
+import uuid
+
+import pytest
+
+if not os.getenv("MYSQL_PASSWORD"):
+    pytest.skip("MYSQL_PASSWORD is not set", allow_module_level=True)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from mysql.connector import errors  # noqa: E402
+
+from app import db  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    try:
+        db.get_connection().close()
+    except errors.Error as e:
+        pytest.skip(f"MySQL is not reachable: {e}")
+    with TestClient(app) as client:
+        yield client
+
+
+def payment_count(order_id):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM payments WHERE order_id = %s", (order_id,))
+        (count,) = cursor.fetchone()
+        cursor.close()
+        return count
+    finally:
+        conn.close()
+
+
+def charge_in_parallel(client, duplicates, order_id, amount, key):
+    barrier = threading.Barrier(duplicates)
+    responses = [None] * duplicates
+
+    def send(i):
+        barrier.wait()
+        responses[i] = client.post(
+            "/v1/payments/charge",
+            json={"order_id": order_id, "amount": amount},
+            headers={"Idempotency-Key": key},
+        )
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(duplicates)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+@pytest.mark.parametrize("duplicates", [2, 4])
+def test_parallel_duplicates_create_one_payment(client, duplicates):
+    # Far above real data, so the row count only sees this test
+    order_id = random.randint(10**8, 2 * 10**9)
+    responses = charge_in_parallel(client, duplicates, order_id, 125.5, f"test-{uuid.uuid4().hex}")
+
+    assert [r.status_code for r in responses] == [201] * duplicates
+    assert len({(r.json()["reference"], r.json()["status"]) for r in responses}) == 1
+    replayed = [r.headers.get("Idempotent-Replayed") == "true" for r in responses]
+    assert replayed.count(False) == 1
+    assert payment_count(order_id) == 1
+
+
+def test_key_reused_for_a_different_charge_is_rejected(client):
+    order_id = random.randint(10**8, 2 * 10**9)
+    key = f"test-{uuid.uuid4().hex}"
+    first = client.post("/v1/payments/charge", json={"order_id": order_id, "amount": 10.0},
+                        headers={"Idempotency-Key": key})
+    second = client.post("/v1/payments/charge", json={"order_id": order_id, "amount": 20.0},
+                         headers={"Idempotency-Key": key})
+
+    assert first.status_code == 201
+    assert second.status_code == 422
+    assert payment_count(order_id) == 1
@@ -118,9 +118,12 @@ USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://127.0.0.1:8000/v1/users
 ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://127.0.0.1:8001/v1/orders")
 INVENTORY_SERVICE_URL = os.getenv("INVENTORY_SERVICE_URL", "http://127.0.0.1:8002/v1/inventory")
 PAYMENT_SERVICE_URL = os.getenv("PAYMENT_SERVICE_URL", "http://127.0.0.1:8003/v1/payments")
+PAYMENT_ORDERS_URL = os.getenv("PAYMENT_ORDERS_URL", "http://127.0.0.1:8003/v1/orders")
 SHIPPING_SERVICE_URL = os.getenv("SHIPPING_SERVICE_URL", "http://127.0.0.1:8004/v1/shipping")
+CATALOG_SERVICE_URL = os.getenv("CATALOG_SERVICE_URL", "http://127.0.0.1:8000/v1/products")
 
 USE_MOCK_USER = os.getenv("USE_MOCK_USER", "True").lower() == "true"
 USE_MOCK_INVENTORY = os.getenv("USE_MOCK_INVENTORY", "True").lower() == "true"
 USE_MOCK_PAYMENT = os.getenv("USE_MOCK_PAYMENT", "True").lower() == "true"
 USE_MOCK_SHIPPING = os.getenv("USE_MOCK_SHIPPING", "True").lower() == "true"
+USE_MOCK_CATALOG = os.getenv("USE_MOCK_CATALOG", "True").lower() == "true"
@@ -0,0 +1,33 @@
+import requests
+from decimal import Decimal
+from django.conf import settings
+
+# Catalog service base URL (use env var for flexibility in Docker/K8s)
+CATALOG_SERVICE_URL = getattr(settings, "CATALOG_SERVICE_URL", "http://catalog-service:8000/v1/products")
+MOCK_CATALOG = getattr(settings, "USE_MOCK_CATALOG", True)
+
+
+def get_catalog_prices(product_ids):
+    """
+    Fetch current catalog prices for many products in one request.
+    Returns {product_id: Decimal price} for active products, or None when
+    prices cannot be checked (mock mode or catalog unavailable).
+    """
+    if MOCK_CATALOG:
+        print("[CatalogClient] Mock mode ON – skipping price validation.")
+        return None
+
+    ids = ",".join(str(pid) for pid in sorted(set(product_ids)))
+    try:
+        response = requests.get(f"{CATALOG_SERVICE_URL}/lookup", params={"ids": ids}, timeout=5)
+        if response.status_code != 200:
+            print(f"[CatalogClient] Price lookup failed ({response.status_code}): {response.text}")
+            return None
+        return {
+            item["product_id"]: Decimal(str(item["price"]))
+            for item in response.json()["items"]
+            if item["is_active"] and item["price"] is not None
+        }
+    except requests.exceptions.RequestException as e:
+        print(f"[CatalogClient] Price lookup error: {e}")
+        return None
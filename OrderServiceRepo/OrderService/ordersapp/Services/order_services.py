@@ -18,6 +18,26 @@ class OrderService:
         total = subtotal * (1 + OrderService.TAX_PERCENT) + OrderService.SHIPPING_COST
         return total.quantize(Decimal("0.01"), rounding=ROUND_HALF_EVEN)
     
+    @staticmethod
+    def find_price_mismatches(items, catalog_prices):
+        """
+        Compare client-supplied unit prices with catalog prices.
+        Returns a list of error dicts (empty when every item matches).
+        """
+        errors = []
+        for item in items:
+            expected = catalog_prices.get(item["product_id"])
+            if expected is None:
+                errors.append({"product_id": item["product_id"], "error": "Unknown or inactive product"})
+            elif Decimal(item["unit_price"]).quantize(Decimal("0.01")) != expected.quantize(Decimal("0.01")):
+                errors.append({
+                    "product_id": item["product_id"],
+                    "error": "Price mismatch",
+                    "unit_price": str(item["unit_price"]),
+                    "catalog_price": str(expected),
+                })
+        return errors
+
     @staticmethod
     def get_order_data(order_id):
         try:
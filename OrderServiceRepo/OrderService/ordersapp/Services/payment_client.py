@@ -1,18 +1,27 @@
 import requests
 from django.conf import settings
 import random
+import uuid
 from ..Status.payment_status import PaymentMethod
 
 
 # Base URL of the Payment Service
 PAYMENT_SERVICE_URL = getattr(settings, "PAYMENT_SERVICE_URL", "http://payment-service:8002/v1/payments")
+# Order-scoped payment routes (e.g. refund every payment of an order)
+PAYMENT_ORDERS_URL = getattr(settings, "PAYMENT_ORDERS_URL", "http://payment-service:8002/v1/orders")
 MOCK_PAYMENT = getattr(settings, "USE_MOCK_PAYMENT", True)
+CHARGE_ATTEMPTS = 2
 
 
 def charge_payment(order_id, customer_id, amount):
     """
     Sends a payment charge request to the Payment Service.
     Returns True if successful, False otherwise.
+
+    Each call is one charge attempt with its own Idempotency-Key, reused by the
+    retries below: a retry after a timeout returns the original payment instead
+    of charging twice, while a later call (e.g. after a declined charge) is a
+    new attempt and charges again.
     """
     if MOCK_PAYMENT:
         print(f"[PaymentClient] Mock mode ON – payment for Order {order_id} always succeeds.")
@@ -25,30 +34,37 @@ def charge_payment(order_id, customer_id, amount):
         "method": random.choice(list(PaymentMethod)).value
     }
 
-    try:
-        response = requests.post(f"{PAYMENT_SERVICE_URL}/charge/", json=payload, timeout=5)
-        if response.status_code in (200, 201):
-            print(f"[PaymentClient] Payment successful for Order {order_id}")
-            return True
-        else:
-            print(f"[PaymentClient] Payment failed for Order {order_id}: {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"[PaymentClient] Payment request failed for Order {order_id}: {e}")
-        return False
+    headers = {"Idempotency-Key": f"order-{order_id}-{uuid.uuid4().hex}"}
+
+    for attempt in range(1, CHARGE_ATTEMPTS + 1):
+        try:
+            response = requests.post(f"{PAYMENT_SERVICE_URL}/charge/", json=payload, headers=headers, timeout=5)
+            if response.status_code in (200, 201):
+                print(f"[PaymentClient] Payment successful for Order {order_id}")
+                return True
+            else:
+                print(f"[PaymentClient] Payment failed for Order {order_id}: {response.text}")
+                return False
+        except requests.exceptions.RequestException as e:
+            # Safe to retry: the idempotency key prevents a second charge
+            print(f"[PaymentClient] Payment request failed for Order {order_id} (attempt {attempt}): {e}")
+    return False
 
 
 def refund_payment(order_id):
     """
-    Sends a refund request to the Payment Service.
+    Sends a refund request for all successful payments of the order to the Payment Service.
     Returns True if successful, False otherwise.
+
+    The refund is idempotent on the Payment Service side, so calling it again
+    for an already refunded order still returns True.
     """
     if MOCK_PAYMENT:
         print(f"[PaymentClient] Mock mode ON – refund for Order {order_id} always succeeds.")
         return True
 
     try:
-        response = requests.post(f"{PAYMENT_SERVICE_URL}/{order_id}/refund/", timeout=5)
+        response = requests.post(f"{PAYMENT_ORDERS_URL}/{order_id}/payments/refund", timeout=5)
         if response.status_code == 200:
             print(f"[PaymentClient] Refund successful for Order {order_id}")
             return True
@@ -58,3 +74,31 @@ def refund_payment(order_id):
     except requests.exceptions.RequestException as e:
         print(f"[PaymentClient] Refund request failed for Order {order_id}: {e}")
         return False
+
+
+def get_payment_statuses(order_ids):
+    """
+    Resolves the payment status (PENDING/PAID/REFUNDED/FAILED) of many orders
+    with one request to the Payment Service.
+    Returns {order_id: status}, or None if the Payment Service is unavailable
+    (and in mock mode, where there are no payments to look up).
+    """
+    if not order_ids:
+        return {}
+    if MOCK_PAYMENT:
+        print(f"[PaymentClient] Mock mode ON – using stored payment statuses for {len(order_ids)} orders.")
+        return None
+
+    try:
+        response = requests.get(
+            f"{PAYMENT_ORDERS_URL}/payments",
+            params={"order_ids": ",".join(str(order_id) for order_id in order_ids)},
+            timeout=5
+        )
+        if response.status_code == 200:
+            return {order["order_id"]: order["payment_status"] for order in response.json()["orders"]}
+        print(f"[PaymentClient] Payment status lookup failed: {response.text}")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"[PaymentClient] Payment status lookup failed: {e}")
+        return None
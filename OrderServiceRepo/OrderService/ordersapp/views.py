@@ -16,7 +16,8 @@ from .models import Order
 from .serializer import OrderSerializer
 from .Services.order_services import OrderService
 from .Services.inventory_client import reserve_inventory, release_inventory
-from .Services.payment_client import charge_payment
+from .Services.payment_client import charge_payment, get_payment_statuses
+from .Services.catalog_client import get_catalog_prices
 from .Services.shipping_client import get_shipping_queryset_for_customer, create_shipment
 from .Status.order_status import OrderStatus, SortBy, Direction
 from .Status.payment_status import PaymentStatus
@@ -59,6 +60,18 @@ class OrderViewSet(viewsets.GenericViewSet):
         serializer.is_valid(raise_exception=True)
 
         items = serializer.validated_data.get('items', [])
+
+        # Validate client-supplied unit prices against the catalog in one lookup
+        if items:
+            catalog_prices = get_catalog_prices([i["product_id"] for i in items])
+            if catalog_prices is not None:
+                mismatches = OrderService.find_price_mismatches(items, catalog_prices)
+                if mismatches:
+                    return Response(
+                        {"error": "Price validation failed", "items": mismatches},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
         total = OrderService.calculate_order_total(items) if items else 0
         serializer.validated_data['order_total'] = total
 
@@ -275,6 +288,14 @@ def order_history(request, customer_id):
     paginator = Paginator(orders_with_shipping, 3)
     orders_page = paginator.get_page(request.GET.get("page"))
 
+    # Show the Payment Service's status for the orders on this page (one request);
+    # keep the stored status when it is unreachable or has no payment for the order
+    payment_statuses = get_payment_statuses([order.order_id for order in orders_page]) or {}
+    for order in orders_page:
+        live_status = payment_statuses.get(order.order_id)
+        if live_status and live_status != PaymentStatus.PENDING.value:
+            order.payment_status = live_status
+
     # Context for rendering template
     context = {
         "orders": orders_page,
@@ -1,3 +1,4 @@
+from sqlalchemy import case, func, select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from datetime import datetime, timedelta, timezone
@@ -8,41 +9,75 @@ TTL_MINUTES = 15
 def get_inventory(db: Session, product_id: int):
     return db.query(models.Inventory).filter(models.Inventory.product_id == product_id).all()
 
+def _stock_row_id(product_id: int):
+    """The inventory row stock operations act on: the product's first row."""
+    return (
+        select(models.Inventory.inventory_id)
+        .where(models.Inventory.product_id == product_id)
+        .order_by(models.Inventory.inventory_id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+def _apply_stock_update(db: Session, product_id: int, condition, **values):
+    """Run one conditional UPDATE ... RETURNING on the product's row and commit.
+
+    The check and the write are a single statement, so concurrent requests for
+    the same product cannot both pass the check; there is no read-modify-write
+    in Python and no lock held beyond the row update itself. Returns the
+    updated row, or None when the row is missing or `condition` failed.
+    """
+    stmt = (
+        update(models.Inventory)
+        .where(models.Inventory.inventory_id == _stock_row_id(product_id))
+        .values(**values)
+        .returning(*models.Inventory.__table__.c)
+        .execution_options(synchronize_session=False)
+    )
+    if condition is not None:
+        stmt = stmt.where(condition)
+    row = db.execute(stmt).first()
+    db.commit()
+    return row
+
 def reserve_stock(db: Session, product_id: int, qty: int):
-    inv = db.query(models.Inventory).filter_by(product_id=product_id).first()
+    inv = _apply_stock_update(
+        db, product_id,
+        models.Inventory.on_hand - models.Inventory.reserved >= qty,
+        reserved=models.Inventory.reserved + qty,
+        reserved_at=func.now(),
+    )
+    if inv:
+        return inv
+
+    inv = get_inventory_by_product_id(db, product_id)
     if not inv:
         raise HTTPException(status_code=404, detail="Inventory not found")
-
     available = inv.on_hand - inv.reserved
-    if available < qty:
-        raise HTTPException(status_code=400,
-                            detail=f"Insufficient stock. Reduce quantity to <= {available}.")
-
-    inv.reserved += qty
-    inv.reserved_at = datetime.utcnow()
-    db.commit()
-    db.refresh(inv)
-    return inv
+    raise HTTPException(status_code=400,
+                        detail=f"Insufficient stock. Reduce quantity to <= {available}.")
 
 def release_stock(db: Session, product_id: int, qty: int):
-    inv = db.query(models.Inventory).filter_by(product_id=product_id).first()
+    remaining = func.greatest(models.Inventory.reserved - qty, 0)
+    inv = _apply_stock_update(
+        db, product_id, None,
+        reserved=remaining,
+        reserved_at=case((remaining == 0, None), else_=models.Inventory.reserved_at),
+    )
     if not inv:
         raise HTTPException(status_code=404, detail="Inventory not found")
-    inv.reserved = max(inv.reserved - qty, 0)
-    inv.reserved_at = None if inv.reserved == 0 else inv.reserved_at
-    db.commit()
-    db.refresh(inv)
     return inv
 
 def ship_stock(db: Session, product_id: int, qty: int):
-    inv = db.query(models.Inventory).filter_by(product_id=product_id).first()
-    if not inv or inv.reserved < qty:
+    inv = _apply_stock_update(
+        db, product_id,
+        models.Inventory.reserved >= qty,
+        reserved=models.Inventory.reserved - qty,
+        on_hand=models.Inventory.on_hand - qty,
+        reserved_at=case((models.Inventory.reserved - qty == 0, None), else_=models.Inventory.reserved_at),
+    )
+    if not inv:
         raise HTTPException(status_code=400, detail="Not enough reserved stock to ship")
-    inv.reserved -= qty
-    inv.on_hand -= qty
-    inv.reserved_at = None if inv.reserved == 0 else inv.reserved_at
-    db.commit()
-    db.refresh(inv)
     return inv
 
 def release_expired_reservations(db: Session):
@@ -63,7 +98,12 @@ def release_expired_reservations(db: Session):
     return released_count
 
 def get_inventory_by_product_id(db: Session, product_id: int):
-    return db.query(models.Inventory).filter(models.Inventory.product_id == product_id).first()
+    return (
+        db.query(models.Inventory)
+        .filter(models.Inventory.product_id == product_id)
+        .order_by(models.Inventory.inventory_id)
+        .first()
+    )
 
 def update_inventory_by_product_id(db: Session, product_id: int, data):
     inv = get_inventory_by_product_id(db, product_id)
@@ -85,3 +125,20 @@ def create_inventory_from_sync(db: Session, data):
     db.refresh(new_item)
     return new_item
 
+def create_inventory_from_sync_batch(db: Session, product_ids):
+    """Create default inventory rows for the product_ids that have none yet.
+
+    Returns (created, existing) counts.
+    """
+    product_ids = set(product_ids)
+    existing = {
+        row.product_id for row in
+        db.query(models.Inventory.product_id).filter(models.Inventory.product_id.in_(product_ids)).all()
+    }
+    new_items = [
+        models.Inventory(product_id=product_id, on_hand=100, reserved=0, warehouse="MAIN")
+        for product_id in sorted(product_ids - existing)
+    ]
+    db.add_all(new_items)
+    db.commit()
+    return len(new_items), len(existing)
@@ -1,10 +1,27 @@
+import os
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from ..database import SessionLocal
 from .. import crud, schemas
 
 router = APIRouter(prefix="/v1/inventory", tags=["Inventory"])
 
+# Opt-in: encode with orjson and skip response_model re-validation of ORM rows
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+INVENTORY_FIELDS = tuple(schemas.InventoryResponse.__fields__)
+
+def _inventory_dict(inv):
+    return {field: getattr(inv, field) for field in INVENTORY_FIELDS}
+
+def _respond(result):
+    """Return ORM rows as-is (validated via response_model) or, on the fast path, as orjson."""
+    if not FAST_JSON_RESPONSES:
+        return result
+    if isinstance(result, list):
+        return ORJSONResponse([_inventory_dict(inv) for inv in result])
+    return ORJSONResponse(_inventory_dict(result))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -14,19 +31,19 @@ def get_db():
 
 @router.get("/onhand", response_model=list[schemas.InventoryResponse])
 def get_on_hand(product_id: int, db: Session = Depends(get_db)):
-    return crud.get_inventory(db, product_id)
+    return _respond(crud.get_inventory(db, product_id))
 
 @router.post("/reserve", response_model=schemas.InventoryResponse)
 def reserve(req: schemas.OperationRequest, db: Session = Depends(get_db)):
-    return crud.reserve_stock(db, req.product_id, req.quantity)
+    return _respond(crud.reserve_stock(db, req.product_id, req.quantity))
 
 @router.post("/release", response_model=schemas.InventoryResponse)
 def release(req: schemas.OperationRequest, db: Session = Depends(get_db)):
-    return crud.release_stock(db, req.product_id, req.quantity)
+    return _respond(crud.release_stock(db, req.product_id, req.quantity))
 
 @router.post("/ship", response_model=schemas.InventoryResponse)
 def ship(req: schemas.OperationRequest, db: Session = Depends(get_db)):
-    return crud.ship_stock(db, req.product_id, req.quantity)
+    return _respond(crud.ship_stock(db, req.product_id, req.quantity))
 
 @router.post("/reaper")
 def manual_reaper(db: Session = Depends(get_db)):
@@ -48,3 +65,11 @@ def sync_product(product: schemas.InventorySync, db: Session = Depends(get_db)):
         new_item = crud.create_inventory_from_sync(db, product)
         return new_item
 
+@router.post("/sync/batch", response_model=schemas.InventorySyncBatchResponse)
+def sync_products_batch(payload: schemas.InventorySyncBatch, db: Session = Depends(get_db)):
+    """
+    Bulk variant of /sync used by the Catalog service's bulk upsert:
+    creates inventory entries for every product_id that has none.
+    """
+    created, existing = crud.create_inventory_from_sync_batch(db, payload.product_ids)
+    return {"created": created, "existing": existing}
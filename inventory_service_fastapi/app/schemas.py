@@ -26,3 +26,12 @@ class InventorySync(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class InventorySyncBatch(BaseModel):
+    product_ids: list[int]
+
+
+class InventorySyncBatchResponse(BaseModel):
+    created: int
+    existing: int